@@ -2,31 +2,28 @@
 Custom Calendar Widget for Finance Manager v3
 """
 import colorsys
+from array import array
 import datetime
+import heapq
 import logging
 import sqlite3
 import sys
 import time
 import timeit
 
-import matplotlib.colors
-
+import database as db
 import settings
 
 from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QDialog, QTreeWidgetItem, QDialogButtonBox, QVBoxLayout,\
     QMenu, QSplashScreen, QDateEdit, QComboBox, QLineEdit, QTableWidgetItem, QCompleter, QFrame, QScrollArea,\
-    QAbstractItemView, QFileDialog
+    QAbstractItemView, QFileDialog, QListWidget, QListWidgetItem
 from PyQt6.QtGui import QTextCharFormat, QColor, QPixmap, QRegularExpressionValidator, QStandardItem
-from PyQt6.uic import loadUi
-from PyQt6.QtCore import QTimer, Qt, QDateTime, QEvent, QRegularExpression
+from forms import load_ui
+from PyQt6.QtCore import QTimer, Qt, QDateTime, QEvent, QRegularExpression, QAbstractTableModel, QModelIndex, \
+    QObject, QRunnable, QThreadPool, pyqtSignal
 from functions import *
 from requests.exceptions import ConnectionError
 
-import matplotlib.pyplot as plt
-from matplotlib.dates import MONTHLY, DateFormatter, rrulewrapper, RRuleLocator, drange, DAILY
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from math import ceil
-
 
 class MySplashScreen(QSplashScreen):
     """Custom Splash Screen"""
@@ -37,7 +34,7 @@ class MySplashScreen(QSplashScreen):
         super(MySplashScreen, self).__init__()
 
         # Load User Interface
-        loadUi("ui/splashscreen.ui", self)
+        load_ui("ui/splashscreen.ui", self)
 
         # Remove frame
         self.setWindowFlag(Qt.WindowType.FramelessWindowHint)
@@ -66,45 +63,79 @@ class MySplashScreen(QSplashScreen):
 class MyCalendarWidget(QWidget):
     """Custom calendar Widget - add and manage tasks"""
 
+    # Tasks added, removed or checked
+    tasks_modified = pyqtSignal()
+
+    # Task database
+    database = "bin/taskList.db"
+
+    # Changed task states are saved together after this delay [ms]
+    SAVE_DELAY = 500
+
+    # Calendar date colors - all tasks completed / some tasks open
+    COMPLETED_COLOR = QColor(0, 150, 0, 50)  # Green
+    OPEN_COLOR = QColor(200, 0, 0, 50)  # Red
+
     def __init__(self):
         """Constructor"""
         super(QWidget, self).__init__()
 
         # Load Interface from Qt Designer
-        loadUi("ui/mycalendar.ui", self)
+        load_ui("ui/mycalendar.ui", self)
 
         self.calendarWidget.setGridVisible(True)
 
         self.calendarWidget.selectionChanged.connect(self.calendarDateChanged)
+        self.calendarWidget.currentPageChanged.connect(self.format_dates)
+
+        # Dates with tasks by month - {(year, month): {date: number of open tasks}}
+        self.month_dates = {}
+
+        # Longest task duration in days - tasks overlapping a day start at most this many days before it
+        self.max_span = self.load_max_span()
 
         self.add_btn.clicked.connect(self.add)
         self.remove_btn.clicked.connect(self.remove)
         self.today_btn.clicked.connect(self.today)
 
-        self.calendarDateChanged()
+        # Changed task states - {task id: "YES"/"NO"} and date ranges of changed tasks
+        self.dirty_tasks = {}
+        self.dirty_ranges = set()
+        self.taskTreeWidget.itemChanged.connect(self.task_changed)
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.check_update)
-        self.timer.start(1000)
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(self.SAVE_DELAY)
+        self.save_timer.timeout.connect(self.save_task_states)
+
+        # Changes made just before exit are saved too
+        if QApplication.instance() is not None:
+            QApplication.instance().aboutToQuit.connect(self.save_task_states)
+
+        self.calendarDateChanged()
+        self.format_dates()
 
     def calendarDateChanged(self):
-        """Calendar date change action"""
+        """Calendar date change action - dates are formatted when shown month changes"""
         date_selected = self.calendarWidget.selectedDate().toPyDate()
         self.updateTaskList(date_selected)
-        self.format_dates()
 
     def updateTaskList(self, date):
         """Update Task list with selected date"""
+        # Filling the list is not a change of task state
+        self.taskTreeWidget.blockSignals(True)
         self.taskTreeWidget.clear()
 
-        db = sqlite3.connect("bin/taskList.db")
-        cursor = db.cursor()
-        query = f"SELECT task, task_desc, completed FROM tasks WHERE date = '{date}'"
-        results = cursor.execute(query).fetchall()
+        results = self.tasks_in_range("task, task_desc, completed, id, date, date2", date, date)
 
         for result in results:
-            result = list(result)
-            item = QTreeWidgetItem(result)
+            item = QTreeWidgetItem(list(result[:3]))
+            item.setData(0, Qt.ItemDataRole.UserRole, result[3])
+            item.setData(1, Qt.ItemDataRole.UserRole, self.task_range(result[4], result[5]))
+
+            # Show state not saved yet
+            if result[3] in self.dirty_tasks:
+                item.setText(2, self.dirty_tasks[result[3]])
 
             item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
             if item.text(2) == "YES":
@@ -114,29 +145,28 @@ class MyCalendarWidget(QWidget):
 
             self.taskTreeWidget.addTopLevelItem(item)
 
-        db.close()
+        self.taskTreeWidget.blockSignals(False)
 
     def remove(self):
         """Remove Task from database and list"""
-        task = self.taskTreeWidget.selectedIndexes()
-        query = f"DELETE FROM tasks WHERE task = '{task[0].data()}' AND task_desc = '{task[1].data()}'"
+        item = self.taskTreeWidget.currentItem()
+        if item is None:
+            return
 
-        date = self.calendarWidget.selectedDate().toPyDate()
-        date_format = QTextCharFormat()
-        self.calendarWidget.setDateTextFormat(QDate.fromString(str(date), "yyyy-M-d"), date_format)
+        # Item is deleted when task list is filled again
+        task_id = item.data(0, Qt.ItemDataRole.UserRole)
+        start, stop = item.data(1, Qt.ItemDataRole.UserRole)
 
-        conn = sqlite3.connect("bin/taskList.db")
-        cursor = conn.cursor()
-        cursor.execute(query)
-        conn.commit()
-        conn.close()
+        save_data(self.database, "DELETE FROM tasks WHERE id = ?", (task_id,))
+        self.dirty_tasks.pop(task_id, None)
 
         self.calendarDateChanged()
+        self.tasks_changed(start, stop)
 
     def add(self):
         """Create new task"""
         new_task = QDialog(self)
-        loadUi("ui/taskeditor.ui", new_task)
+        load_ui("ui/taskeditor.ui", new_task)
 
         def save_new_task():
             """Save new task to task database"""
@@ -145,16 +175,17 @@ class MyCalendarWidget(QWidget):
             task_name = new_task.task_name.text()
             task_desc = new_task.task_desc.text()
             start = new_task.start_date.date().toPyDate()
-            stop = new_task.end_date.date().toPyDate()
-            # id_numb = set_id("bin/taskList.db", "tasks")
+            stop = max(start, new_task.end_date.date().toPyDate())
+            # id_numb = set_id(self.database, "tasks")
 
             # Database
-            query = f"INSERT INTO tasks (task, task_desc, completed, date, date2) " \
-                    f"VALUES ('{task_name}', '{task_desc}', 'NO', '{start}', '{stop}')"
-            save_data("bin/taskList.db", query)
+            query = "INSERT INTO tasks (task, task_desc, completed, date, date2) VALUES (?, ?, 'NO', ?, ?)"
+            save_data(self.database, query, (task_name, task_desc, str(start), str(stop)))
 
             new_task.close()
+            self.max_span = max(self.max_span, (stop - start).days)
             self.calendarDateChanged()
+            self.tasks_changed(start, stop)
 
         new_task.start_date.setDate(QDate(QDate.currentDate()))
         new_task.end_date.setDate(QDate(QDate.currentDate()))
@@ -167,48 +198,106 @@ class MyCalendarWidget(QWidget):
         self.calendarWidget.setSelectedDate(today_date)
         logging.info("Calendar sets to today's date")
 
-    def format_dates(self):
-        """Format task dates in calendar"""
+    def format_dates(self, year=None, month=None):
+        """Format task dates of shown month (loaded with one query, then from cache)"""
+        if year is None:
+            year, month = self.calendarWidget.yearShown(), self.calendarWidget.monthShown()
+
+        if (year, month) not in self.month_dates:
+            self.month_dates[(year, month)] = self.load_month(year, month)
+
+        # Remove formats of previously shown month
+        self.calendarWidget.setDateTextFormat(QDate(), QTextCharFormat())
+
+        for date, open_tasks in self.month_dates[(year, month)].items():
+            self.calendarWidget.setDateTextFormat(QDate.fromString(date, "yyyy-M-d"), self.task_format(open_tasks))
+
+    def load_month(self, year, month):
+        """Returns dates of month with tasks - {date: number of open tasks}"""
+        first = datetime.date(year, month, 1)
+        last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+
+        dates = {}
+        for start, stop, open_task in self.tasks_in_range("date, date2, completed = 'NO'", first, last):
+            day, stop = self.task_range(start, stop)
+            day, stop = max(day, first), min(stop, last)
+            while day <= stop:
+                dates[str(day)] = dates.get(str(day), 0) + open_task
+                day += datetime.timedelta(days=1)
+
+        return dates
+
+    def load_max_span(self):
+        """Returns duration of longest task in days"""
+        query = "SELECT MAX(julianday(date2) - julianday(date)) FROM tasks"
+        return int(get_data_from_database(self.database, query)[0][0] or 0)
+
+    def tasks_in_range(self, columns, start, stop):
+        """
+        Returns columns of tasks overlapping days from start to stop.
+
+        Only tasks starting max_span days before start can overlap, so tasks are read from one range of
+        tasks_range index (date, date2) however many tasks are in database.
+        """
+        query = f"SELECT {columns} FROM tasks WHERE date BETWEEN ? AND ? AND date2 >= ?"
+        first_start = start - datetime.timedelta(days=self.max_span)
+        return get_data_from_database(self.database, query, (str(first_start), str(stop), str(start)))
+
+    @staticmethod
+    def task_range(start, stop):
+        """Task start and end date (task without end date lasts one day)"""
+        start = datetime.date.fromisoformat(start)
+        return start, datetime.date.fromisoformat(stop) if stop else start
+
+    def tasks_changed(self, start, stop):
+        """Tasks between start and stop changed - their months are loaded again"""
+        for key in list(self.month_dates):
+            if (start.year, start.month) <= key <= (stop.year, stop.month):
+                del self.month_dates[key]
 
-        # Gets all tasks from database
-        dates = get_data_from_database("bin/taskList.db", f"SELECT date, completed FROM tasks")
+        self.format_dates()
+        self.tasks_modified.emit()
+
+    def task_format(self, open_tasks):
+        """Date format - red if some tasks are open, green if all are completed, none without tasks"""
+        task_format = QTextCharFormat()
+        if open_tasks is not None:
+            task_format.setBackground(self.OPEN_COLOR if open_tasks else self.COMPLETED_COLOR)
+        return task_format
 
-        if len(dates) == 0:
+    def task_changed(self, item, column):
+        """Task checked or unchecked - state is saved after SAVE_DELAY"""
+        if column != 0:
             return
 
-        dates = set([date[0] for date in dates])
+        state = "YES" if item.checkState(0) == Qt.CheckState.Checked else "NO"
+        if state == item.text(2):
+            return
 
-        task_format = QTextCharFormat()
-        for date in dates:
-            tasks = get_data_from_database("bin/taskList.db",
-                                           f"SELECT completed FROM tasks WHERE date = '{date}'")
-            if len(tasks) == 1:
-                if tasks[0][0] == "YES":
-                    task_format.setBackground(QColor(0, 150, 0, 50))  # Green
-                else:
-                    task_format.setBackground(QColor(200, 0, 0, 50))  # Red
-            else:
-                all_completed = [t[0] for t in tasks]
-                if "NO" in all_completed:
-                    task_format.setBackground(QColor(200, 0, 0, 50))  # Red
-                else:
-                    task_format.setBackground(QColor(0, 150, 0, 50))  # Green
+        self.taskTreeWidget.blockSignals(True)
+        item.setText(2, state)
+        self.taskTreeWidget.blockSignals(False)
+
+        self.dirty_tasks[item.data(0, Qt.ItemDataRole.UserRole)] = state
+        self.dirty_ranges.add(item.data(1, Qt.ItemDataRole.UserRole))
+        self.save_timer.start()
 
-            self.calendarWidget.setDateTextFormat(QDate.fromString(date, "yyyy-M-d"), task_format)
+    def save_task_states(self):
+        """Save changed task states in one transaction and format dates of changed tasks"""
+        self.save_timer.stop()
+        if not self.dirty_tasks:
+            return
 
-    def check_update(self):
-        """Updates task status in task database"""
+        with db.transaction(self.database) as conn:
+            conn.executemany("UPDATE tasks SET completed = ? WHERE id = ?",
+                             [(state, task_id) for task_id, state in self.dirty_tasks.items()])
+        logging.debug(f"{len(self.dirty_tasks)} task states saved")
 
-        for i in range(self.taskTreeWidget.topLevelItemCount()):
-            item = self.taskTreeWidget.topLevelItem(i)
-            state = None
-            if item.checkState(0) == Qt.CheckState.Checked:
-                state = "YES"
-            elif item.checkState(0) == Qt.CheckState.Unchecked:
-                state = "NO"
-            if state:
-                query = f"UPDATE tasks SET completed = '{state}' WHERE task = '{item.text(0)}'"
-                save_data("bin/taskList.db", query)
+        ranges = self.dirty_ranges
+        self.dirty_tasks = {}
+        self.dirty_ranges = set()
+        for start, stop in ranges:
+            self.tasks_changed(start, stop)
 
 
 class LcdDateTime(QWidget):
@@ -217,15 +306,17 @@ class LcdDateTime(QWidget):
     def __init__(self):
         """Constructor"""
         super().__init__()
-        loadUi("ui/lcddatetime.ui", self)
+        load_ui("ui/lcddatetime.ui", self)
 
-        # Updates every 1 second
+        # Time is shown in minutes - updated at start of every minute
         self.timer = QTimer()
+        self.timer.setSingleShot(True)
         self.timer.timeout.connect(self.updateLCD)
-        self.timer.start(1000)
+        self.updateLCD()
 
     def updateLCD(self):
         """Updates current time"""
+        self.timer.start(60000 - QDateTime.currentMSecsSinceEpoch() % 60000)
 
         # Dan u tjednu
         week = ["Ponedjeljak", "Utorak", "Srijeda", "Četvrtak", "Petak", "Subota", "Nedjelja"]
@@ -240,6 +331,396 @@ class LcdDateTime(QWidget):
         self.lcd_date.setText(st_current_date)
 
 
+class ReminderWidget(QWidget):
+    """Dashboard list of task reminders - hidden while there are no reminders"""
+
+    def __init__(self):
+        """Constructor"""
+        super().__init__()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        layout.addWidget(QLabel("<b>PODSJETNICI</b>"))
+        self.reminder_list = QListWidget()
+        self.reminder_list.setToolTip("Dvostruki klik uklanja podsjetnik")
+        self.reminder_list.itemDoubleClicked.connect(self.dismiss)
+        layout.addWidget(self.reminder_list)
+
+        self.hide()
+
+    def add_reminder(self, task_id, task, end):
+        """Show reminder of task ending on end date"""
+        item = QListWidgetItem(f"{end.strftime('%d.%m.%Y.')} - rok zadatka: {task}")
+        item.setData(Qt.ItemDataRole.UserRole, task_id)
+        self.reminder_list.addItem(item)
+        self.show()
+
+    def remove_tasks(self, task_ids):
+        """Remove reminders of tasks"""
+        for row in reversed(range(self.reminder_list.count())):
+            if self.reminder_list.item(row).data(Qt.ItemDataRole.UserRole) in task_ids:
+                self.reminder_list.takeItem(row)
+        if self.reminder_list.count() == 0:
+            self.hide()
+
+    def dismiss(self, item):
+        """Remove reminder from list"""
+        self.reminder_list.takeItem(self.reminder_list.row(item))
+        if self.reminder_list.count() == 0:
+            self.hide()
+
+
+class LedgerModel(QAbstractTableModel):
+    """
+    Table model for income/outcome entries and report totals.
+
+    Rows are kept column by column (amounts in a float array) and cells are formatted only when the view asks
+    for them, so views with uniform row heights only format visible rows.
+    """
+
+    def __init__(self, header, amount_column, parent=None):
+        """Constructor"""
+        super().__init__(parent)
+        self.header = header
+        self.amount_column = amount_column
+        self.columns = [[] for _ in header]
+        self.amounts = array("d")
+
+    def set_rows(self, rows):
+        """Replace model data with rows from database"""
+        self.beginResetModel()
+        columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in self.header]
+        self.amounts = array("d", (amount or 0.0 for amount in columns[self.amount_column]))
+        columns[self.amount_column] = []
+        self.columns = columns
+        self.endResetModel()
+
+    def insert_row(self, row):
+        """Append one row"""
+        position = len(self.amounts)
+        self.beginInsertRows(QModelIndex(), position, position)
+        for column, value in enumerate(row):
+            if column == self.amount_column:
+                self.amounts.append(value or 0.0)
+            else:
+                self.columns[column].append(value)
+        self.endInsertRows()
+
+    def update_row(self, position, row):
+        """Replace values of row at position"""
+        for column, value in enumerate(row):
+            if column == self.amount_column:
+                self.amounts[position] = value or 0.0
+            else:
+                self.columns[column][position] = value
+        self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.header) - 1))
+
+    def remove_row(self, position):
+        """Remove row at position"""
+        self.beginRemoveRows(QModelIndex(), position, position)
+        for column in self.columns:
+            if column:
+                del column[position]
+        self.amounts.pop(position)
+        self.endRemoveRows()
+
+    def add_amount(self, position, amount):
+        """Add amount to amount column of row at position"""
+        self.amounts[position] += amount
+        index = self.index(position, self.amount_column)
+        self.dataChanged.emit(index, index)
+
+    def find(self, column, value):
+        """Position of first row with value in column, None if there is no such row"""
+        try:
+            return self.columns[column].index(value)
+        except ValueError:
+            return None
+
+    def row(self, position):
+        """Row at position with values as loaded from database"""
+        return tuple(self.amounts[position] if column == self.amount_column else self.columns[column][position]
+                     for column in range(len(self.header)))
+
+    def rowCount(self, parent=QModelIndex()):
+        """Number of rows"""
+        return 0 if parent.isValid() else len(self.amounts)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Number of columns"""
+        return 0 if parent.isValid() else len(self.header)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        """Cell text - amounts with thousands separator"""
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self.cell(index.row(), index.column())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        """Column names"""
+        if orientation == Qt.Orientation.Horizontal:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return self.header[section]
+            if role == Qt.ItemDataRole.TextAlignmentRole:
+                return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def cell(self, row, column):
+        """Formatted cell text"""
+        if column == self.amount_column:
+            return f"{self.amounts[row]:,.2f}"
+        return str(self.columns[column][row])
+
+    def row_values(self, row):
+        """Row as strings for edit/delete dialogs - amount without thousands separator"""
+        return [f"{self.amounts[row]:.2f}" if column == self.amount_column else str(self.columns[column][row])
+                for column in range(len(self.header))]
+
+    def rows(self):
+        """All rows as displayed - used for export"""
+        return [[self.cell(row, column) for column in range(len(self.header))] for row in range(len(self.amounts))]
+
+    def total(self):
+        """Sum of amount column"""
+        return sum(self.amounts)
+
+
+def selected_ledger_row(view):
+    """Returns values of selected row in ledger view, empty list if nothing is selected"""
+    rows = view.selectionModel().selectedRows() if view.selectionModel() else []
+    return view.model().row_values(rows[0].row()) if rows else []
+
+
+class WorkerSignals(QObject):
+    """Signals of background worker - (generation, result) or (generation, error message)"""
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class Worker(QRunnable):
+    """Runs function in thread pool and delivers its result through signals"""
+
+    def __init__(self, generation, function, *args):
+        """Constructor"""
+        super().__init__()
+        self.generation = generation
+        self.function = function
+        self.args = args
+        self.signals = WorkerSignals()
+
+    def run(self):
+        """Called in worker thread"""
+        try:
+            result = self.function(*self.args)
+        except Exception as err:
+            logging.exception(f"Background task failed: {err}")
+            self.signals.failed.emit(self.generation, str(err))
+        else:
+            self.signals.finished.emit(self.generation, result)
+
+
+class LatestQueryRunner(QObject):
+    """
+    Runs queries in background thread - only result of the latest request is delivered.
+
+    Every request gets new generation number. Request still waiting in pool is dropped when a new one comes in
+    and results of superseded requests are ignored.
+    """
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        """Constructor"""
+        super().__init__(parent)
+        # One worker thread kept for whole runtime - its database connections are reused by every request
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pool.setExpiryTimeout(-1)
+        self.generation = 0
+        self.delivered = 0
+
+    def submit(self, function, *args):
+        """Run function(*args) in background, superseding pending request - returns generation number"""
+        self.generation += 1
+        self.pool.clear()
+
+        worker = Worker(self.generation, function, *args)
+        worker.signals.finished.connect(self._finished)
+        worker.signals.failed.connect(self._failed)
+        self.pool.start(worker)
+
+        return self.generation
+
+    def _finished(self, generation, result):
+        """Worker finished - deliver result of latest request"""
+        if generation == self.generation:
+            self.delivered = generation
+            self.finished.emit(result)
+        else:
+            logging.debug(f"Result of superseded request {generation} dropped")
+
+    def _failed(self, generation, message):
+        """Worker failed - report error of latest request"""
+        if generation == self.generation:
+            self.delivered = generation
+            self.failed.emit(message)
+
+    def pending(self):
+        """Check if result of latest request is still expected"""
+        return self.delivered != self.generation
+
+    def shutdown(self):
+        """Wait for running request to finish, then close database connections in worker thread - used on exit"""
+        self.pool.clear()
+        self.pool.start(Worker(0, db.close_thread))
+        self.pool.waitForDone()
+
+
+class ConnectivityMonitor(QObject):
+    """
+    Checks internet access in background thread - result is delivered by signal and kept in state.
+
+    While offline, checks are repeated with exponential backoff (retry_min doubled up to retry_max seconds);
+    while online, access is checked again every retry_max seconds.
+    """
+    checked = pyqtSignal(bool)
+
+    def __init__(self, url, timeout=3, retry_min=5, retry_max=300, parent=None):
+        """Constructor"""
+        super().__init__(parent)
+        self.url = url
+        self.timeout = timeout
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self.retry = retry_min
+
+        # Last known state - None until first check is finished
+        self.state = None
+        self.checking = False
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.check)
+
+    def check(self):
+        """Start check in background - ignored while previous check is running"""
+        if self.checking:
+            return
+        self.checking = True
+        self.timer.stop()
+
+        worker = Worker(0, check_internet_connection, self.url, self.timeout)
+        worker.signals.finished.connect(lambda _, online: self._finished(online))
+        worker.signals.failed.connect(lambda _, __: self._finished(False))
+        self.pool.start(worker)
+
+    def check_now(self):
+        """Check requested by user - starts backoff from beginning"""
+        self.retry = self.retry_min
+        self.check()
+
+    def _finished(self, online):
+        """Check finished - keep state and plan next check"""
+        self.checking = False
+        if online != self.state:
+            logging.info("Internet Access" if online else "No Internet Access")
+        self.state = online
+
+        if online:
+            self.retry = self.retry_min
+            delay = self.retry_max
+        else:
+            delay = self.retry
+            self.retry = min(self.retry * 2, self.retry_max)
+        self.timer.start(delay * 1000)
+
+        self.checked.emit(online)
+
+
+class ReminderScheduler(QObject):
+    """
+    Reminders of open tasks on their end date (date2).
+
+    Upcoming reminders are kept in heap ordered by time and one single-shot timer is armed for the first of them,
+    so nothing runs until a reminder is due. Reminders are loaded again when tasks change (reload).
+    """
+    due = pyqtSignal(int, str, object)  # task id, task, end date
+    finished = pyqtSignal(object)  # ids of tasks with shown reminders that are completed or removed
+
+    # Time of reminder on task end date
+    REMINDER_TIME = datetime.time(8, 0)
+
+    # Longest timer interval [ms] - later reminders arm the timer again when it expires
+    MAX_INTERVAL = 2 ** 31 - 1
+
+    def __init__(self, database, parent=None):
+        """Constructor"""
+        super().__init__(parent)
+        self.database = database
+
+        # Reminders - heap of (time, task id, task, end date); shown reminders - {(task id, end date)}
+        self.heap = []
+        self.shown = set()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fire)
+
+    def reload(self):
+        """Load reminders of open tasks ending today or later and arm timer"""
+        self.drop_finished()
+
+        query = "SELECT id, task, date2 FROM tasks WHERE completed = 'NO' AND date2 >= ?"
+        results = get_data_from_database(self.database, query, (str(datetime.date.today()),)) or []
+
+        self.heap = []
+        for task_id, task, end in results:
+            end = datetime.date.fromisoformat(end)
+            if (task_id, end) not in self.shown:
+                self.heap.append((datetime.datetime.combine(end, self.REMINDER_TIME), task_id, task, end))
+        heapq.heapify(self.heap)
+
+        self.arm()
+
+    def drop_finished(self):
+        """Forget shown reminders of tasks completed or removed since - their ids are emitted by finished"""
+        shown_ids = {task_id for task_id, _ in self.shown}
+        if not shown_ids:
+            return
+
+        query = f"SELECT id FROM tasks WHERE completed = 'NO' AND id IN ({', '.join('?' * len(shown_ids))})"
+        open_ids = {row[0] for row in get_data_from_database(self.database, query, tuple(shown_ids)) or []}
+
+        finished_ids = shown_ids - open_ids
+        if finished_ids:
+            self.shown = {key for key in self.shown if key[0] not in finished_ids}
+            self.finished.emit(finished_ids)
+
+    def arm(self):
+        """Start timer for first reminder - timer is stopped without reminders"""
+        self.timer.stop()
+        if not self.heap:
+            return
+
+        delay = (self.heap[0][0] - datetime.datetime.now()).total_seconds() * 1000
+        self.timer.start(int(min(max(delay, 0), self.MAX_INTERVAL)))
+
+    def fire(self):
+        """Emit all reminders that are due and arm timer for next one"""
+        now = datetime.datetime.now()
+        while self.heap and self.heap[0][0] <= now:
+            _, task_id, task, end = heapq.heappop(self.heap)
+            self.shown.add((task_id, end))
+            self.due.emit(task_id, task, end)
+
+        self.arm()
+
+
 class ConfirmDialog(QDialog):
     """Confirm dialog"""
 
@@ -282,7 +763,7 @@ class BillEditor(QWidget):
         """Constructor"""
 
         super(QWidget, self).__init__()
-        loadUi("ui/billseditor.ui", self)
+        load_ui("ui/billseditor.ui", self)
 
         self.database = database if database else "Not selected"
 
@@ -312,22 +793,18 @@ class BillEditor(QWidget):
     def update_table(self, database_path, bill_type="all"):
         """Update Bill tree table"""
 
-        # Connect database
-        conn = sqlite3.connect(database_path)
-        cursor = conn.cursor()
-
         # Create query
-        query = f"SELECT * FROM bills WHERE date >= '{self.year.value()}-01-01' AND date <= '{self.year.value()}-12-31'"
+        query = "SELECT * FROM bills WHERE date >= ? AND date <= ?"
+        params = (f"{self.year.value()}-01-01", f"{self.year.value()}-12-31")
         if bill_type in ["Ulazni", "Income", "Ulazni računi"]:
-            query += " AND TYPE = 'Ulazni račun'"
+            query += " AND type = ?"
+            params += ("Ulazni račun",)
         elif bill_type in ["Izlazni", "Outcome", "Izlazni računi"]:
-            query += " AND TYPE = 'Izlazni račun'"
+            query += " AND type = ?"
+            params += ("Izlazni račun",)
 
         # Execute query
-        cursor.execute(query)
-
-        # Fetch results
-        bills = cursor.fetchall()
+        bills = get_data_from_database(database_path, query, params)
 
         # Clean tree widget
         self.tree_bill.clear()
@@ -342,9 +819,6 @@ class BillEditor(QWidget):
             except Exception as err:
                 logging.error(err)
 
-        # Close database
-        conn.close()
-
     def combo_change(self):
         """Change bill type"""
         if self.combo_table.currentText() == "Ulazni računi":
@@ -366,7 +840,7 @@ class BillEditor(QWidget):
 
         # Create dialog
         dlg = QDialog(self)
-        loadUi("ui/billedit.ui", dlg)
+        load_ui("ui/billedit.ui", dlg)
         dlg.setWindowTitle("Izmjena podataka računa")
 
         # Fill Dialog with selected data from table
@@ -391,17 +865,13 @@ class BillEditor(QWidget):
             """Save new bill"""
 
             # Create query
-            query = f"UPDATE bills SET " \
-                    f"type = '{dlg.bill_type.currentText()}', " \
-                    f"number = '{dlg.number.text()}', " \
-                    f"date = '{dlg.date.date().toPyDate()}', " \
-                    f"issued = '{dlg.issued.text()}', " \
-                    f"adress = '{dlg.adress.text()}', " \
-                    f"amount = '{dlg.amount.text()}', " \
-                    f"desc = '{dlg.desc.text()}' WHERE id = '{dlg.id_text.text()}'"
+            query = "UPDATE bills SET type = ?, number = ?, date = ?, issued = ?, adress = ?, amount = ?, desc = ? " \
+                    "WHERE id = ?"
+            params = (dlg.bill_type.currentText(), dlg.number.text(), str(dlg.date.date().toPyDate()),
+                      dlg.issued.text(), dlg.adress.text(), dlg.amount.text(), dlg.desc.text(), dlg.id_text.text())
 
             # Execute query
-            save_data(self.database, query)
+            save_data(self.database, query, params)
 
             # Close dialog
             dlg.close()
@@ -422,10 +892,10 @@ class BillEditor(QWidget):
         id_number = self.tree_bill.selectedIndexes()[0].data()
 
         # Create query
-        query = f"DELETE FROM bills WHERE id = {id_number}"
+        query = "DELETE FROM bills WHERE id = ?"
 
         # Execute query
-        save_data(self.database, query)
+        save_data(self.database, query, (int(id_number),))
 
         # Update view
         self.update_table(self.database, bill_type=self.combo_table.currentText())
@@ -433,7 +903,7 @@ class BillEditor(QWidget):
     def action_create(self):
         """Open new bill entry Dialog"""
         dlg = QDialog(self)
-        loadUi("ui/billinput.ui", dlg)
+        load_ui("ui/billinput.ui", dlg)
         dlg.setWindowTitle("Izrada novih računa")
 
         # Table Layout
@@ -485,10 +955,10 @@ class BillEditor(QWidget):
                 amount = dlg.table.cellWidget(irow, 5).text()
                 desc = dlg.table.cellWidget(irow, 6).text()
 
-                query = f"INSERT INTO bills(type, number, date, issued, adress, amount, desc) " \
-                        f"VALUES ('{bill_type}', '{number}', '{date}', '{issued}', '{adress}', '{amount}', '{desc}')"
+                query = "INSERT INTO bills(type, number, date, issued, adress, amount, desc) " \
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)"
                 try:
-                    save_data(self.database, query)
+                    save_data(self.database, query, (bill_type, number, str(date), issued, adress, amount, desc))
                 except Exception as err:
                     logging.error(f"Error while saving new bills to database: {err}")
 
@@ -535,7 +1005,7 @@ class BackUpRetriveWindow(QDialog):
         """Constructor"""
 
         super(BackUpRetriveWindow, self).__init__(parent=parent)
-        loadUi("ui/dataretrive.ui", self)
+        load_ui("ui/dataretrive.ui", self)
 
         # Button actions connection
         self.btn_db.clicked.connect(self.action_db)
@@ -592,7 +1062,7 @@ class TokenInputWidget(QDialog):
 
     def __init__(self, parent=None):
         super(TokenInputWidget, self).__init__()
-        loadUi("ui/token.ui", self)
+        load_ui("ui/token.ui", self)
 
         # Setup link
         app_link = "https://www.dropbox.com/developers/apps/info/2cnixj5ux96n7ob"
@@ -614,7 +1084,7 @@ class LoginWidget(QDialog):
 
     def __init__(self, parent=None):
         super(LoginWidget, self).__init__()
-        loadUi("ui/login.ui", self)
+        load_ui("ui/login.ui", self)
 
         # Set parent
         self.setParent(parent)
@@ -685,323 +1155,164 @@ class LoginWidget(QDialog):
 class StatisticsWidget(QWidget):
     """Table statistics"""
 
-    def __init__(self, database):
+    def __init__(self, database, catalog=None):
         """Constructor"""
 
         # Load interface
         super(StatisticsWidget, self).__init__()
-        loadUi("ui/statisticstable.ui", self)
+        load_ui("ui/statisticstable.ui", self)
 
         # Disable edit
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
 
-        # Set database
+        # Set database and income/outcome codes
         self.database = database
+        self.catalog = catalog if catalog else settings.CodeCatalog("bin/settings.db")
 
         # Connect combo change action
         self.combo_table.activated.connect(self.combo_change)
 
-        # Prepare data
-        data_to_show, codes = self.calculate_data()
-
-        # Create table - income/outcome
-        self.set_table(data_to_show, codes)
-
-        # Add data to table
-        self.show_data_in_table(data_to_show)
-
-        # Add yearly totals
+        # Prepare data, create table - income/outcome and add data to table
+        self.combo_change()
 
     @property
     def table_type(self):
         """Returns table type: income OR outcome"""
         return "income" if self.combo_table.currentText() == "Prihodi" else "outcome"
 
-    def get_years(self, database, table):
-        """Get available years from database"""
-        query = f"SELECT day FROM {table}"
-        dates = [date[0] for date in get_data_from_database(database, query)]
-
-        for idate, date in enumerate(dates):
-            if len(date) == 10:
-                dates[idate] = datetime.datetime.strptime(date, "%Y-%m-%d")
-            elif len(date) == 19:
-                dates[idate] = datetime.datetime.strptime(date, "%Y-%m-%d 00:00:00")
-
-        years = [date.year for date in dates]
-
-        return set(years)
-
     def calculate_data(self):
-        """Calculates sums per code per year"""
-
-        # Get available years - initiation
-        data = {key: None for key in self.get_years(self.database, self.table_type)}
+        """Calculates sums per code per year - returns matrix (rows codes, columns years), codes, years"""
 
         # Get codes from settings database
         codes = self.code_and_desc()
 
-        # Create data to show
-        for year in data.keys():
-            amount = {}
-            for code in codes.keys():
-                query = f"SELECT amount FROM {self.table_type} WHERE code = {code} " \
-                        f"AND day >= '{year}-01-01 00:00:00' AND day <= '{year}-12-31 00:00:00'"
-
-                amount[code] = sum(float(entry[0]) for entry in get_data_from_database(self.database, query))
-            data[year] = amount
+        matrix, _, years = calculate_year_code_pivot(self.database, self.table_type, list(codes.keys()))
 
-        return data, codes
+        return matrix, codes, years
 
-    def set_table(self, data, codes):
+    def set_table(self, years, codes):
         """Setup table - row/column number and name"""
-        self.table.setColumnCount(len(data))
-        header_column = [str(iyear) for iyear in data.keys()]
-        self.table.setHorizontalHeaderLabels(header_column)
+        self.table.setColumnCount(len(years))
+        self.table.setHorizontalHeaderLabels([str(year) for year in years])
 
         # Name rows
-        # header_rows = [str(i) for i in (data[list(data.keys())[0]]).keys()]
         header_rows = [str(codes[i]) for i in codes.keys()]
         header_rows.append("Ukupno")
         self.table.setRowCount(len(header_rows))
         self.table.setVerticalHeaderLabels(header_rows)
 
-    def show_data_in_table(self, data):
+    def show_data_in_table(self, matrix):
         """Put data in table"""
-        for iyear, year in enumerate(data.keys()):
-
-            # Yearly total
-            total = sum([float(amount) for amount in data[year].values()])
-
-            # Remove Cash income/outcome
-            total = total - (list(data[year].values()).pop())
-
+        for icode, row in enumerate(matrix):
             # Total per code per year
-            for icode, code in enumerate(data[year].keys()):
-                self.table.setItem(icode, iyear, QTableWidgetItem(f"{data[year][code]:,.2f}"))
+            for iyear, amount in enumerate(row):
+                self.table.setItem(icode, iyear, QTableWidgetItem(f"{amount:,.2f}"))
 
-            self.table.setItem(len(data[year].keys()), iyear, QTableWidgetItem(f"{total:,.2f}"))
+        if not matrix:
+            return
+
+        for iyear in range(len(matrix[0])):
+            # Yearly total - without Cash income/outcome (last code)
+            total = sum(row[iyear] for row in matrix[:-1])
+            self.table.setItem(len(matrix), iyear, QTableWidgetItem(f"{total:,.2f}"))
 
     def combo_change(self):
         """Income/Outcome statistics combo change action"""
-        data, codes = self.calculate_data()
-        self.set_table(data, codes)
-        self.show_data_in_table(data)
+        matrix, codes, years = self.calculate_data()
+        self.set_table(years, codes)
+        self.show_data_in_table(matrix)
 
     def code_and_desc(self):
         """Connects codes with description"""
-        codes = {}
-        query = f"SELECT * FROM {self.table_type}"
-
-        for code, desc in get_data_from_database("bin/settings.db", query):
-            codes[code] = desc
-
-        return codes
+        return dict(self.catalog.descriptions[self.table_type])
 
 
 class GraphicsWidget(QWidget):
-    """Graphical display of data"""
+    """
+    Graphical display of data.
 
-    def __init__(self, parent, database, start, stop):
-        """Constructor"""
+    Graphs are drawn by backend chosen in settings; PNG export is always made with matplotlib.
+    """
+
+    def __init__(self, parent, database, start, stop, period_data=None, backend="matplotlib", style="Default"):
+        """
+        Constructor - start and stop are dates of chosen period (date or YYYY-MM-DD),
+        period_data is {table: (dates, totals)} already loaded for chosen period
+        """
 
         super(GraphicsWidget, self).__init__(parent=parent)
-        loadUi("ui/graphics.ui", self)
+        load_ui("ui/graphics.ui", self)
 
         self.database = database
         self.start = start
         self.stop = stop
 
+        # Graph backend - graph libraries are loaded with first graph
+        import charts
+        self.colors = charts.chart_colors(style, self.parent().palette())
+        self.charts = charts.CHART_BACKENDS.get(backend, charts.MatplotlibCharts)(self.colors)
+        logging.debug(f"Graph backend: {type(self.charts).__name__}")
+
+        # Yearly data - loaded when yearly graph is shown
+        self.yearly_data = None
+
         # Connect combo and button action
         self.combo_graphics.activated.connect(self.combo_action)
         self.btn_save_image.clicked.connect(self.export_image)
 
         # Show Graphics
-        canvas = self.period_plot(self.database)
-
-        while self.layout_plot.count() > 0:
-            self.layout_plot.removeItem(self.layout_plot.itemAt(0))
-
-        self.layout_plot.addWidget(canvas)
-
-    def period_plot(self, database):
-        """Draw income and outcome for chosen period - returns canvas widget"""
-
-        # Colors
-        background = self.parent().palette().base().color().name()
-        text = self.parent().palette().text().color().name()
-
-        # Chosen period
-        date_from = self.start.date().toPyDate()
-        date_to = self.stop.date().toPyDate()
-
-        # Retrive data
-        income_dates, income = calculate_totals(date_from, date_to, "income", database)
-        outcome_dates, outcome = calculate_totals(date_from, date_to, "outcome", database)
-
-        # set_ylim
-        try:
-            ylim = max([max(income), max(outcome)])
-            ylim = ceil(ylim / 1000) * 1000
-        except Exception as e:
-            logging.info(e)
-            logging.info("Setting ylim to 2000")
-            ylim = 2000
-
-        # Handle dates
-        income_dates = handle_dates(income_dates)
-        outcome_dates = handle_dates(outcome_dates)
-
-        # Manage date ticks
-        rule = rrulewrapper(MONTHLY, interval=1)
-        loc = RRuleLocator(rule)
-        formatter = DateFormatter("%b")
-
-        # Create Figure
-        fig = plt.figure(facecolor=background)
-
-        # Plot income
-        plt.subplot(2, 1, 1, facecolor=background)
-        plt.subplots_adjust(hspace=.5)
-        plt.plot_date(income_dates, income, "-", color=text)
-
-        # Add label, grid and title
-        plt.ylabel("\N{euro sign}", color=text)
-        plt.grid(True, color=text)
-        plt.title("PRIHODI", color=text)
-
-        # Draw ticks on x axes
-        ax = plt.gca()
-        ax.xaxis.set_major_locator(loc)
-        ax.xaxis.set_major_formatter(formatter)
-        ax.xaxis.set_tick_params(rotation=30, labelsize=10, colors=text)
-
-        # Set y axis color
-        ax.yaxis.set_tick_params(colors=text)
-        ax.set_ylim([0, ylim])
-
-        # Frame color
-        ax.spines['top'].set_color(text)
-        ax.spines['bottom'].set_color(text)
-        ax.spines['left'].set_color(text)
-        ax.spines['right'].set_color(text)
-
-        # Plot outcome
-        plt.subplot(2, 1, 2, facecolor=background)
-        plt.plot_date(outcome_dates, outcome, "-", color=text)
-        plt.ylabel("\N{euro sign}", color=text)
-        plt.grid(True, color=text)
-        plt.title("RASHODI", color=text)
-
-        # Add label, grid and title
-        ax = plt.gca()
-        ax.xaxis.set_major_locator(loc)
-        ax.xaxis.set_major_formatter(formatter)
-        ax.xaxis.set_tick_params(rotation=30, labelsize=10, colors=text)
-
-        # Set y axis color
-        ax.yaxis.set_tick_params(colors=text)
-        ax.set_ylim([0, ylim])
-
-        # Frame color
-        ax.spines['top'].set_color(text)
-        ax.spines['bottom'].set_color(text)
-        ax.spines['left'].set_color(text)
-        ax.spines['right'].set_color(text)
-
-        return FigureCanvasQTAgg(fig)
-
-    def draw_yearly_data(self, database):
-        """Draw income, outcome and profit data by year - return canvas"""
-
-        # Colors
-        background = self.parent().palette().base().color().name()
-        text = self.parent().palette().text().color().name()
-        if QColor(text).getRgbF()[0] > 0.51:
-            bar_color_1 = tuple([i-0.2 for i in QColor(text).getRgbF()[0:3]])
-            bar_color_2 = tuple([i-0.3 for i in QColor(text).getRgbF()[0:3]])
-            bar_color_3 = tuple([i-0.4 for i in QColor(text).getRgbF()[0:3]])
-            grid = tuple([i + 0.05 for i in QColor(background).getRgbF()[0:3]])
-        else:
-            bar_color_1 = tuple([i - 0.2 + 0.5 for i in QColor(text).getRgbF()[0:3]])
-            bar_color_2 = tuple([i - 0.3 + 0.5 for i in QColor(text).getRgbF()[0:3]])
-            bar_color_3 = tuple([i - 0.4 + 0.5 for i in QColor(text).getRgbF()[0:3]])
-            grid = tuple([i - 0.05 for i in QColor(background).getRgbF()[0:3]])
-
-        if QColor(background).getRgbF() in [(1.0, 1.0, 1.0, 1.0), (0.6872549176216125,
-                                                                   0.7500000119209289, 0.8127451062202453)]:
-            grid = "grey"
-
-        # Get years
-        years = StatisticsWidget(database).get_years(database, "income")
-
-        # Retrive data
-        income_per_year = {}
-        outcome_per_year = {}
-        diff = {}
-        for year in years:
-            query = f"SELECT amount FROM income WHERE day >= '{year}-01-01' AND day <= '{year}-12-31'"
-            income_per_year[year] = sum([i[0] for i in get_data_from_database(database, query)])
-            query = f"SELECT amount FROM outcome WHERE day >= '{year}-01-01' AND day <= '{year}-12-31'"
-            outcome_per_year[year] = sum([i[0] for i in get_data_from_database(database, query)])
-            diff[year] = income_per_year[year]-outcome_per_year[year]
-
-        # Set limits and labels
-        ylim = max([max(income_per_year.values()), max(outcome_per_year.values())])
-        ylim = ceil(ylim / 1000) * 1000 * 1.1
-
-        # Bar with
-        bar_width = 0.25
-
-        # Create Figure
-        fig = plt.figure(facecolor=background)
-
-        # Create bar plot
-        plt.subplot(facecolor=background)
-        plt.bar([i - bar_width for i in income_per_year.keys()], income_per_year.values(), color=bar_color_1, width=bar_width)
-        plt.bar(outcome_per_year.keys(), outcome_per_year.values(), color=bar_color_2, width=bar_width)
-        plt.bar([i + bar_width for i in income_per_year.keys()], diff.values(), color=bar_color_3, width=bar_width)
-
-        plt.ylabel("\N{euro sign}", color=text)
-        plt.grid(True, linestyle='--', color=grid)
-        plt.title("PRIHODI I RASHODI", color=text)
-
-        # Set x axis
-        ax = plt.gca()
-        ax.xaxis.set_tick_params(colors=text)
-        ax.set_xlim([2020, 2025])
-
-        # Set y axis color
-        ax.yaxis.set_tick_params(colors=text)
-        ax.set_yticklabels(["{:,.0f}".format(label) for label in ax.get_yticks()])
-        ax.set_ylim([0, ylim])
-
-        # Frame color
-        ax.spines['top'].set_color(text)
-        ax.spines['bottom'].set_color(text)
-        ax.spines['left'].set_color(text)
-        ax.spines['right'].set_color(text)
-
-        return FigureCanvasQTAgg(fig)
+        self.set_data(period_data)
+
+    def set_data(self, period_data=None, start=None, stop=None):
+        """New data for chosen period (start, stop if period is changed) - loaded if period_data is not given"""
+        if start is not None:
+            self.start, self.stop = start, stop
+
+        if period_data is None:
+            period_data = {table: calculate_totals(self.start, self.stop, table, self.database)
+                           for table in ["income", "outcome"]}
+
+        self.period_data = {table: (handle_dates(list(dates)), totals) for table, (dates, totals) in
+                            period_data.items()}
+        self.yearly_data = None
+        self.combo_action()
+
+    def load_yearly_data(self):
+        """Income and outcome totals by year - returns (years, income, outcome)"""
+        if self.yearly_data is None:
+            years = get_years(self.database, "income")
+            income_totals = calculate_totals_per_year(self.database, "income")
+            outcome_totals = calculate_totals_per_year(self.database, "outcome")
+            self.yearly_data = (years, [income_totals.get(year, 0.0) for year in years],
+                                [outcome_totals.get(year, 0.0) for year in years])
+        return self.yearly_data
+
+    def chart(self):
+        """Shown graph - period OR yearly"""
+        return "period" if self.combo_graphics.currentText() == "Pregled perioda" else "yearly"
 
     def combo_action(self):
         """Change shown graphics"""
-        if self.combo_graphics.currentText() == "Pregled perioda":
-            canvas = self.period_plot(self.database)
+        if self.chart() == "period":
+            widget = self.charts.period(self.period_data)
         else:
-            canvas = self.draw_yearly_data(self.database)
+            widget = self.charts.yearly(self.load_yearly_data())
 
-        while self.layout_plot.count() > 0:
-            self.layout_plot.removeItem(self.layout_plot.itemAt(0))
+        shown = self.layout_plot.itemAt(0).widget() if self.layout_plot.count() > 0 else None
+        if shown is not widget:
+            while self.layout_plot.count() > 0:
+                self.layout_plot.takeAt(0).widget().hide()
+            self.layout_plot.addWidget(widget)
+            widget.show()
 
-        self.layout_plot.addWidget(canvas)
+    def closeEvent(self, event):
+        """Close figures with widget"""
+        self.charts.close()
+        super().closeEvent(event)
 
     def export_image(self):
         """Save image to png"""
 
-        # Get current image
-        canvas = self.layout_plot.itemAt(0).widget()
-
         # Ask for file
         filepath = QFileDialog(self, "Choose path for image", ".", "PNG (*.png)")
         filepath.setFileMode(QFileDialog.FileMode.AnyFile)
@@ -1014,8 +1325,19 @@ class GraphicsWidget(QWidget):
             path = filepath.selectedFiles()[0]
             logging.info("Selected PNG file for writing data")
 
-        # Save image
-        canvas.print_png(path)
+        # Save image - matplotlib draws shown graph if other backend is used
+        import charts
+        chart = self.chart()
+        if isinstance(self.charts, charts.MatplotlibCharts):
+            self.charts.save(chart, path)
+        else:
+            exporter = charts.MatplotlibCharts(self.colors)
+            if chart == "period":
+                exporter.period(self.period_data)
+            else:
+                exporter.yearly(self.load_yearly_data())
+            exporter.save(chart, path)
+            exporter.close()
         logging.info(f"Image saved to file: {path}")
 
 
@@ -1052,20 +1374,27 @@ class LinksWidget(QWidget):
             "Ministarstvo turizma i sporta": "https://mint.gov.hr/",
         }
 
-        # Get link style
-        link_style = create_link_style(style)
-
-        # Add links to dashboard
+        # Add links to dashboard - {name: (address, label)}
+        self.links = {}
         for ikey, key in enumerate(links.keys()):
-            link = QLabel(f'<a {link_style} href="{links[key]}"><b>{key}</b></a>')
+            link = QLabel()
             link.setAlignment(Qt.AlignmentFlag.AlignCenter)
             link.setOpenExternalLinks(True)
             link.setToolTip(links[key])
+            self.links[key] = (links[key], link)
 
             layout.addWidget(link)
             if ikey < len(links.keys()) - 1:
                 layout.addWidget(QHLine())
 
+        self.set_style(style)
+
+    def set_style(self, style="Default"):
+        """Format links with colors of style"""
+        link_style = create_link_style(style)
+        for key, (address, link) in self.links.items():
+            link.setText(f'<a {link_style} href="{address}"><b>{key}</b></a>')
+
 
 class IzvodControlWidget(QWidget):
     """Under Construction"""
@@ -1075,7 +1404,7 @@ class IzvodControlWidget(QWidget):
 
         # Load interface
         super(IzvodControlWidget, self).__init__()
-        loadUi("ui/izvodcontrol.ui", self)
+        load_ui("ui/izvodcontrol.ui", self)
 
         # Connect button action
         self.btn_run_control.clicked.connect(self.run_control_action)
@@ -1109,9 +1438,9 @@ def kn_to_euro(database):
 
         result = cursor.fetchall()
 
+        query = f"UPDATE {table} SET amount = ? WHERE id = ?"
         for i in result:
-            query = f"UPDATE {table} SET amount = {i[3]/7.5345:.2f} WHERE id = {i[6]}"
-            cursor.execute(query)
+            cursor.execute(query, (round(i[3] / 7.5345, 2), i[6]))
 
     conn.commit()
 
@@ -1133,6 +1462,6 @@ if __name__ == '__main__':
     # widget = BackUpRetriveWindow(None)
     # widget = MyCalendarWidget()
     # widget = LoginWidget()
-    # widget = GraphicsWidget(parent=None, database="bin/GKSokol.sqlite", start=QDate(2023, 1, 1), stop=QDate(2023, 1, 31))
+    # widget = GraphicsWidget(parent=None, database="bin/GKSokol.sqlite", start="2023-01-01", stop="2023-01-31")
     sys.exit(app.exec())
 
@@ -6,24 +6,33 @@ import logging
 import os.path
 import sys
 import time
-import matplotlib.pyplot
 import requests.exceptions
-import pyqtgraph as pg
-import qtawesome as qta
 import functions as fn
+import database as db
+import startup
+import statement
+import themes
 
 from PyQt6.QtWidgets import QFileDialog, QComboBox, QLineEdit, QTableWidgetItem, QDateEdit, QDateTimeEdit, QStyle,\
     QScrollArea
-from PyQt6 import uic
+from forms import load_ui
 from PyQt6.QtGui import QRegularExpressionValidator, QDesktopServices, QTextFormat
 from PyQt6.QtCore import QUrl, QRegularExpression, Qt
 
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from matplotlib.dates import MONTHLY, DateFormatter, rrulewrapper, RRuleLocator, drange, DAILY
-
 from settings import Settings
 from MyWidgets import *
 
+# Transfer codes left out of financial report
+REPORT_EXCLUDED_CODES = {"income": (13,), "outcome": (21,)}
+
+# Columns of income/outcome and report views - (header, amount column)
+LEDGER_COLUMNS = (["ŠIFRA", "OPIS ŠIFRE", "OPIS", "IZNOS", "DATUM", "NAPOMENA", "ID"], 3)
+REPORT_COLUMNS = (["ŠIFRA", "OPIS", "IZNOS"], 2)
+
+# Themes selected with Ctrl + function key
+THEME_KEYS = {Qt.Key.Key_F1: "Default", Qt.Key.Key_F2: "BlueGreyLight", Qt.Key.Key_F3: "BlueGreyDark",
+              Qt.Key.Key_F4: "WarmGrey", Qt.Key.Key_F5: "CoolGrey", Qt.Key.Key_F6: "DarkRed", Qt.Key.Key_F7: "Green"}
+
 
 class UI(QWidget):
     """Main class for User Interface"""
@@ -45,16 +54,24 @@ class UI(QWidget):
         splash.progress(10, msg="Preparing users information")
 
         # Load GUI
-        uic.loadUi("ui/manager.ui", self)
+        load_ui("ui/manager.ui", self)
         logging.info("User Interface loaded")
+        startup.timer.phase("loadUi")
         splash.progress(20, "Loading interface")
 
-        # Load settings from file
+        # Load settings from file - new settings are added by migrations
         global settings
+        db.migrate("bin/settings.db", db.SETTINGS_MIGRATIONS)
         settings = Settings(file="bin/settings.db")
 
+        # Bring database schemas (indexes) up to date
+        db.migrate(settings.get_setting("database"), db.LEDGER_MIGRATIONS)
+        db.migrate("bin/taskList.db", db.TASK_MIGRATIONS)
+        startup.timer.phase("settings")
+
         # Set style
-        self.setStyleSheet(fn.create_stylesheet(style=settings.get_setting("style")))
+        self.theme = themes.registry.theme(settings.get_setting("style"))
+        self.setStyleSheet(self.theme.stylesheet)
         splash.progress(30, msg="Setting stylesheet")
 
         # Window options
@@ -64,7 +81,15 @@ class UI(QWidget):
         # Add Calendar to Dashboard
         calendar = MyCalendarWidget()
         self.calendar_frame.addWidget(calendar)
-        calendar.format_dates()
+
+        # Task reminders on Dashboard
+        self.reminder_widget = ReminderWidget()
+        self.calendar_frame.addWidget(self.reminder_widget)
+        self.reminders = ReminderScheduler(calendar.database, parent=self)
+        self.reminders.due.connect(self.reminder_widget.add_reminder)
+        self.reminders.finished.connect(self.reminder_widget.remove_tasks)
+        calendar.tasks_modified.connect(self.reminders.reload)
+        self.reminders.reload()
         splash.progress(40, msg="Starting Dashboard - Calendar Widget")
 
         # Setup LCD Clock
@@ -72,14 +97,10 @@ class UI(QWidget):
         self.dashboard_1.addWidget(datetime_widget)
         splash.progress(50, msg="Starting Dashboard - Date Widget")
 
-        # Setup BillEditor
-        self.bill_editor = BillEditor(database=settings.get_setting("database"))
-        self.bill_frame.addWidget(self.bill_editor)
-        splash.progress(60, msg="Loading Bill editor")
-
-        self.statistics_widget = StatisticsWidget(database=settings.get_setting("database"))
-        self.statistics_frame.addWidget(self.statistics_widget)
-        splash.progress(65, msg="Loading Statistics Widget")
+        # Feature tabs (bills, statistics) are built when first shown
+        self.bill_editor = None
+        self.statistics_widget = None
+        self.tab_loaders = {self.tab_5: self.load_bills_tab, self.statistics: self.load_statistics_tab}
 
         # Set object properties - Dates
         date_from = self.__getattribute__("date_from")
@@ -102,17 +123,16 @@ class UI(QWidget):
         self.outcome_desc.setText("SVI RASHODI")
 
         # Add icons to buttons
-        self.btn_hide.setIcon(qta.icon("fa5s.minus"))
-        self.btn_network.setIcon(qta.icon("fa5s.wifi"))
-        self.btn_exit.setIcon(qta.icon("fa5s.window-close"))
-        self.btn_backup.setIcon(qta.icon("fa5s.file-export"))
+        self.set_button_icons()
 
         # Set tooltip
         self.btn_exit.setToolTip("Zatvori aplikaciju")
         self.btn_backup.setToolTip("Spremi datoteke na Dropbox")
 
-        # Check internet connection for the first time
-        self.click_btn_network()
+        # Check internet connection in background - first check now, then periodically
+        self.network_monitor = ConnectivityMonitor(settings.get_setting("network_probe_url"), parent=self)
+        self.network_monitor.checked.connect(self.show_network_state)
+        self.network_monitor.check()
 
         # Add functionality
         self.btn_show.clicked.connect(self.click_btn_show)
@@ -132,6 +152,11 @@ class UI(QWidget):
 
         splash.progress(70, msg="Setting up databases, icons and buttons")
 
+        # Models for income/outcome and report views
+        for tree, columns in [(self.tree_income, LEDGER_COLUMNS), (self.tree_outcome, LEDGER_COLUMNS),
+                              (self.report_income, REPORT_COLUMNS), (self.report_outcome, REPORT_COLUMNS)]:
+            tree.setModel(LedgerModel(*columns, parent=tree))
+
         # Design - INCOME TREE
         fn.set_tree_layout(self.tree_income)
         self.tree_income.doubleClicked.connect(self.click_income_btn2)
@@ -146,7 +171,21 @@ class UI(QWidget):
         fn.set_report_tree_layout(self.report_income)
         fn.set_report_tree_layout(self.report_outcome)
 
-        # Add data
+        # Shown data - set when data is loaded
+        self.shown_filter = None
+        self.totals = {}
+
+        # Graphs are drawn when graph tab is shown
+        self.graphics = None
+        self.graph_data = None
+        self.graphs_dirty = True
+        self.tabWidget.currentChanged.connect(self.tab_changed)
+
+        # Add data - loaded in background, shown when ready
+        self.show_runner = LatestQueryRunner(self)
+        self.show_runner.finished.connect(self.show_data)
+        self.show_runner.failed.connect(self.show_data_failed)
+        QApplication.instance().aboutToQuit.connect(self.show_runner.shutdown)
         self.click_btn_show()
 
         # Income and outcome input table
@@ -159,7 +198,7 @@ class UI(QWidget):
         self.clear_btn.clicked.connect(self.click_clear_btn)
 
         # Links ######################################################################################################
-        self.links_widget = LinksWidget(style=settings.get_setting("style"))
+        self.links_widget = LinksWidget(style=self.theme.name)
         self.links_scroll.setWidget(self.links_widget)
 
         splash.progress(80, msg="Creating links on Dashboard")
@@ -188,6 +227,8 @@ class UI(QWidget):
 
         self.setFocus()
         self.showMaximized()
+        startup.timer.phase("window")
+        QTimer.singleShot(0, lambda: startup.timer.phase("first paint"))
 
         splash.progress(100, msg="Starting Finance Manager III")
 
@@ -255,6 +296,11 @@ class UI(QWidget):
         logging.info("Reboot Finance Manager")
         try:
             self.close()
+
+            # Worker thread of old runner closes its connections and ends with runner
+            self.show_runner.shutdown()
+            self.show_runner.deleteLater()
+
             self.__init__()
         except Exception as err:
             logging.error(f"Reboot failed: {err}")
@@ -284,22 +330,7 @@ class UI(QWidget):
             logging.error(error)
 
     def click_btn_show(self):
-        """Show all data considering choosen dates and codes"""
-
-        # Set Dashboard
-        year = QDateTime.currentDateTime().toPyDateTime().year
-
-        # Total income
-        income, outcome = fn.calculate_year_totals(year, settings.get_setting("database"))
-        daily_income, daily_outcome = fn.calculate_daily_totals(settings.get_setting("database"))
-
-        self.dashboard_income.setText(f"{income:,.2f} \N{euro sign}")
-        self.dashboard_outcome.setText(f"{outcome:,.2f} \N{euro sign}")
-        self.dashboard_total.setText(f"{income - outcome:,.2f} \N{euro sign}")
-
-        self.dashboard_income_2.setText(f"{daily_income:,.2f} \N{euro sign}")
-        self.dashboard_outcome_2.setText(f"{daily_outcome:,.2f} \N{euro sign}")
-        self.dashboard_total_2.setText(f"{daily_income - daily_outcome:,.2f} \N{euro sign}")
+        """Show all data considering choosen dates and codes - data is loaded in background thread"""
 
         # Chosen period
         date_from = self.date_from.date().toPyDate()
@@ -309,59 +340,272 @@ class UI(QWidget):
         code_income = self.combo_income.currentText()
         code_outcome = self.combo_outcome.currentText()
 
+        # Newer request supersedes pending one
+        self.show_runner.submit(self.load_view_data, settings.get_setting("database"), settings.file,
+                                date_from, date_to, str(code_income), str(code_outcome))
+
+    @classmethod
+    def load_view_data(cls, database, settings_file, date_from, date_to, code_income, code_outcome):
+        """Retrive everything shown by click_btn_show - runs in worker thread, so no widgets are used here"""
+
+        # Dashboard totals
+        year = datetime.date.today().year
+        income, outcome = fn.calculate_year_totals(year, database)
+        daily_income, daily_outcome = fn.calculate_daily_totals(database)
+
         # Get income/oucome data from database
-        income_data = fn.get_data_from_database(settings.get_setting("database"),
-                                                self.create_query("income", date_from, date_to, str(code_income)))
-        outcome_data = fn.get_data_from_database(settings.get_setting("database"),
-                                                 self.create_query("outcome", date_from, date_to, str(code_outcome)))
+        income_data = fn.get_data_from_database(database, *cls.create_query("income", date_from, date_to, code_income))
+        outcome_data = fn.get_data_from_database(database,
+                                                 *cls.create_query("outcome", date_from, date_to, code_outcome))
+
+        # Get income/outcome totals for report display
+        report_data_income, report_data_outcome = cls.create_report_data(database, settings_file, date_from, date_to)
+
+        return {
+            "filter": (str(date_from), str(date_to), code_income, code_outcome),
+            "dashboard": (income, outcome, daily_income, daily_outcome),
+            "income": income_data,
+            "outcome": outcome_data,
+            "report_income": report_data_income,
+            "report_outcome": report_data_outcome,
+            "graph": {table: fn.calculate_totals(date_from, date_to, table, database)
+                      for table in ["income", "outcome"]},
+        }
+
+    def show_data(self, data):
+        """Put data loaded by load_view_data into dashboard, trees, reports and graphs"""
+
+        # Period and codes of shown data
+        self.shown_filter = data["filter"]
+        startup.timer.phase("first query")
 
         # Put data to list
-        self.update_tree_list(self.tree_income, income_data)
-        self.update_tree_list(self.tree_outcome, outcome_data)
+        self.update_tree_list(self.tree_income, data["income"])
+        self.update_tree_list(self.tree_outcome, data["outcome"])
+        self.update_tree_list(self.report_income, data["report_income"])
+        self.update_tree_list(self.report_outcome, data["report_outcome"])
+
+        # Totals - later single entry changes are added to them
+        income, outcome, daily_income, daily_outcome = data["dashboard"]
+        self.totals = {
+            "income": self.calculate_total(data["income"]),
+            "outcome": self.calculate_total(data["outcome"]),
+            "report_income": self.calculate_total(data["report_income"]),
+            "report_outcome": self.calculate_total(data["report_outcome"]),
+            "year_income": income,
+            "year_outcome": outcome,
+            "day_income": daily_income,
+            "day_outcome": daily_outcome,
+        }
+        self.show_totals()
+
+        # Graphs are drawn from loaded data
+        self.graph_data = data["graph"]
+        self.mark_graphs_dirty()
+
+    def show_totals(self):
+        """Set dashboard and total labels"""
+        totals = self.totals
 
-        # Get income/outcome totals for report display
-        report_data_income, report_data_outcome = self.create_report_data(date_from, date_to)
-        self.update_tree_list(self.report_income, report_data_income)
-        self.update_tree_list(self.report_outcome, report_data_outcome)
-
-        income_sum = self.calculate_total(income_data)
-        outcome_sum = self.calculate_total(outcome_data)
-        report_income_total = self.calculate_total(report_data_income)
-        report_outcome_total = self.calculate_total(report_data_outcome)
-
-        self.income_total.setText(f"UKUPNO: {income_sum:,.2f} \N{euro sign}")
-        self.outcome_total.setText(f"UKUPNO: {outcome_sum:,.2f} \N{euro sign}")
-        self.total_income.setText(f"UKUPNO PRIHODI: {report_income_total:,.2f} \N{euro sign}")
-        self.total_outcome.setText(f"UKUPNO RASHODI: {report_outcome_total:,.2f} \N{euro sign}")
-        self.total.setText(f"UKUPNO: {(report_income_total - report_outcome_total):,.2f} \N{euro sign}")
-
-        # Add plots to App
-        while self.plot.count() > 0:
-            self.plot.removeItem(self.plot.itemAt(0))
-        self.plot.addWidget(GraphicsWidget(self, settings.get_setting("database"), self.date_from, self.date_to))
+        # Set Dashboard
+        self.dashboard_income.setText(f"{totals['year_income']:,.2f} \N{euro sign}")
+        self.dashboard_outcome.setText(f"{totals['year_outcome']:,.2f} \N{euro sign}")
+        self.dashboard_total.setText(f"{totals['year_income'] - totals['year_outcome']:,.2f} \N{euro sign}")
+
+        self.dashboard_income_2.setText(f"{totals['day_income']:,.2f} \N{euro sign}")
+        self.dashboard_outcome_2.setText(f"{totals['day_outcome']:,.2f} \N{euro sign}")
+        self.dashboard_total_2.setText(f"{totals['day_income'] - totals['day_outcome']:,.2f} \N{euro sign}")
+
+        # Income, outcome and report totals
+        report_total = totals["report_income"] - totals["report_outcome"]
+        self.income_total.setText(f"UKUPNO: {totals['income']:,.2f} \N{euro sign}")
+        self.outcome_total.setText(f"UKUPNO: {totals['outcome']:,.2f} \N{euro sign}")
+        self.total_income.setText(f"UKUPNO PRIHODI: {totals['report_income']:,.2f} \N{euro sign}")
+        self.total_outcome.setText(f"UKUPNO RASHODI: {totals['report_outcome']:,.2f} \N{euro sign}")
+        self.total.setText(f"UKUPNO: {report_total:,.2f} \N{euro sign}")
+
+    def apply_entry_change(self, table, entry_id=None, new_row=None):
+        """
+        Show one saved income/outcome change without reloading data.
+
+        keyword:
+        str table - income OR outcome
+        entry_id - ID of edited or deleted entry (None for new entry)
+        tuple new_row - (code, code_desc, desc, amount, day, remark, id) of new or edited entry (None when deleted)
+        """
+        if self.shown_filter is None or self.show_runner.pending():
+            # Data is (re)loading - loaded data will include the change
+            self.click_btn_show()
+            return
+
+        model = (self.tree_income if table == "income" else self.tree_outcome).model()
+
+        position = None
+        if entry_id is not None:
+            position = model.find(6, int(entry_id))
+            if position is None:
+                # Changed entry is not shown - totals can not be corrected, so reload everything
+                self.click_btn_show()
+                return
+        old_row = model.row(position) if position is not None else None
+
+        # Income/outcome tree
+        if new_row is not None and self.entry_shown(table, new_row):
+            if position is None:
+                model.insert_row(new_row)
+            else:
+                model.update_row(position, new_row)
+        elif position is not None:
+            model.remove_row(position)
+
+        # Totals - old amount out, new amount in
+        for row, sign in [(old_row, -1), (new_row, 1)]:
+            if row is not None:
+                self.add_to_totals(table, row, sign * (row[3] or 0.0))
+        self.show_totals()
+
+        # Graphs are loaded again when shown
+        self.graph_data = None
+        self.mark_graphs_dirty()
+
+    def entry_in_period(self, row):
+        """Check if entry day is in shown period"""
+        date_from, date_to = self.shown_filter[:2]
+        return date_from <= str(row[4])[:10] <= date_to
+
+    def entry_shown(self, table, row):
+        """Check if entry belongs to shown income/outcome tree - period and chosen code"""
+        code = self.shown_filter[2] if table == "income" else self.shown_filter[3]
+        return self.entry_in_period(row) and code in ["0", str(row[0])]
+
+    def add_to_totals(self, table, row, amount):
+        """Add entry amount to every total entry belongs to"""
+        day = str(row[4])
+        today = datetime.date.today()
+
+        if self.entry_shown(table, row):
+            self.totals[table] += amount
+
+        # Report per code - transfers are not in report
+        report = (self.report_income if table == "income" else self.report_outcome).model()
+        position = report.find(0, str(row[0]))
+        if self.entry_in_period(row) and row[0] not in REPORT_EXCLUDED_CODES[table] and position is not None:
+            report.add_amount(position, amount)
+            self.totals[f"report_{table}"] += amount
+
+        if day[:4] == str(today.year):
+            self.totals[f"year_{table}"] += amount
+        if day[:10] == str(today):
+            self.totals[f"day_{table}"] += amount
+
+    def mark_graphs_dirty(self):
+        """Graphs are redrawn now if visible, otherwise when graph tab is opened"""
+        self.graphs_dirty = True
+        if self.tabWidget.currentWidget() is self.tab_6:
+            self.refresh_graphs()
+
+    def refresh_graphs(self):
+        """Redraw graphs for period of shown data - from loaded data if available"""
+        if self.shown_filter is not None:
+            date_from, date_to = self.shown_filter[:2]
+        else:
+            date_from, date_to = self.date_from.date().toPyDate(), self.date_to.date().toPyDate()
+
+        if self.graphics is None:
+            self.graphics = GraphicsWidget(self, settings.get_setting("database"), date_from, date_to,
+                                           period_data=self.graph_data, backend=settings.get_setting("chart_backend"),
+                                           style=self.theme.name)
+            self.plot.addWidget(self.graphics)
+        else:
+            self.graphics.database = settings.get_setting("database")
+            self.graphics.set_data(self.graph_data, date_from, date_to)
+        self.graphs_dirty = False
+
+    def tab_changed(self):
+        """Main tab changed - build tab shown for the first time, draw graphs changed while hidden"""
+        tab = self.tabWidget.currentWidget()
+
+        loader = self.tab_loaders.pop(tab, None)
+        if loader is not None:
+            start = time.perf_counter()
+            loader()
+            logging.info(f"Tab {self.tabWidget.tabText(self.tabWidget.currentIndex())} built in "
+                         f"{time.perf_counter() - start:.3f} s")
+
+        if self.graphs_dirty and tab is self.tab_6:
+            self.refresh_graphs()
+
+    def load_bills_tab(self):
+        """Setup BillEditor"""
+        self.bill_editor = BillEditor(database=settings.get_setting("database"))
+        self.bill_frame.addWidget(self.bill_editor)
+
+    def load_statistics_tab(self):
+        """Setup StatisticsWidget"""
+        self.statistics_widget = StatisticsWidget(database=settings.get_setting("database"), catalog=settings.catalog)
+        self.statistics_frame.addWidget(self.statistics_widget)
+
+    def show_data_failed(self, message):
+        """Background loading of data failed"""
+        fn.popup_message(text=f"Greška pri dohvaćanju podataka:\n{message}", style=self.styleSheet()).exec()
 
     def click_btn_hide(self):
         """Hide and show menu"""
         if self.menu_hidden:
             self.frame_menu.show()
             self.menu_hidden = False
-            self.btn_hide.setIcon(qta.icon("fa5s.minus"))
         else:
             self.frame_menu.hide()
             self.menu_hidden = True
-            self.btn_hide.setIcon(qta.icon("fa5s.plus"))
+        self.btn_hide.setIcon(self.theme.icon("fa5s.plus" if self.menu_hidden else "fa5s.minus"))
 
     def click_btn_network(self):
-        """Check for internet access"""
-        try:
-            urllib.request.urlopen(url="http://google.com")
-            self.btn_network.setIcon(qta.icon("fa5s.wifi", color="green"))
+        """Check for internet access - result is shown by show_network_state"""
+        self.btn_network.setToolTip("Provjera pristupa internetu")
+        self.network_monitor.check_now()
+
+    def show_network_state(self, online):
+        """Show internet access state on network button"""
+        if online:
+            self.btn_network.setIcon(self.theme.icon("fa5s.wifi", color="green"))
             self.btn_network.setToolTip("Pristup internetu omogućen")
-            logging.info("Internet Access")
-        except urllib.error.URLError:
-            self.btn_network.setIcon(qta.icon("fa5s.wifi", color="red"))
+        else:
+            self.btn_network.setIcon(self.theme.icon("fa5s.wifi", color="red"))
             self.btn_network.setToolTip("Nema pristupa internetu")
-            logging.info("No Internet Access")
+
+    def set_button_icons(self):
+        """Set icons of buttons with colors of current theme"""
+        self.btn_hide.setIcon(self.theme.icon("fa5s.plus" if self.menu_hidden else "fa5s.minus"))
+        self.btn_exit.setIcon(self.theme.icon("fa5s.window-close"))
+        self.btn_backup.setIcon(self.theme.icon("fa5s.file-export"))
+
+        state = getattr(self, "network_monitor", None) and self.network_monitor.state
+        if state is None:
+            self.btn_network.setIcon(self.theme.icon("fa5s.wifi"))
+        else:
+            self.show_network_state(state)
+
+    def apply_theme(self, style):
+        """
+        Switch theme - stylesheet is set only if theme is changed, then only widgets with theme colors outside
+        stylesheet (button icons, links and graphs) are updated
+        """
+        theme = themes.registry.theme(style)
+        if theme is self.theme:
+            return
+
+        self.theme = theme
+        self.setStyleSheet(theme.stylesheet)
+        self.set_button_icons()
+        self.change_links_format(theme.name)
+
+        # Graphs are created again with new colors
+        if self.graphics is not None:
+            self.plot.removeWidget(self.graphics)
+            self.graphics.close()
+            self.graphics.deleteLater()
+            self.graphics = None
+            self.mark_graphs_dirty()
 
     '''
     def plot_graphs(self):
@@ -440,24 +684,16 @@ class UI(QWidget):
 
         # Get data from tree widgets
         logging.debug("Getting income data")
-        income_data = [[self.tree_income.topLevelItem(irow).text(i)
-                        for i in range(self.tree_income.columnCount())]
-                       for irow in range(self.tree_income.topLevelItemCount())]
+        income_data = self.tree_income.model().rows()
 
         logging.debug("Getting outcome data")
-        outcome_data = [[self.tree_outcome.topLevelItem(irow).text(i)
-                         for i in range(self.tree_outcome.columnCount())]
-                        for irow in range(self.tree_outcome.topLevelItemCount())]
+        outcome_data = self.tree_outcome.model().rows()
 
         logging.debug("Getting income report data")
-        income_report_data = [[self.report_income.topLevelItem(irow).text(i)
-                               for i in range(self.report_income.columnCount())]
-                              for irow in range(self.report_income.topLevelItemCount())]
+        income_report_data = self.report_income.model().rows()
 
         logging.debug("Getting outcome report data")
-        outcome_report_data = [[self.report_outcome.topLevelItem(irow).text(i)
-                                for i in range(self.report_outcome.columnCount())]
-                               for irow in range(self.report_outcome.topLevelItemCount())]
+        outcome_report_data = self.report_outcome.model().rows()
 
         # Ask for file
         path = QFileDialog(self, "Open file", ".", "Excel (*.xls, *.xlsx)")
@@ -511,7 +747,7 @@ class UI(QWidget):
 
         logging.info("Clicked - IZMIJENI")
         # Get selected row
-        income_data = [i.data() for i in (self.tree_income.selectedIndexes())]
+        income_data = selected_ledger_row(self.tree_income)
         if len(income_data) > 0:
             IncomeEditDialog(parent=self, income_data=income_data)
         else:
@@ -525,20 +761,20 @@ class UI(QWidget):
         logging.info("Clicked - IZBRIŠI")
 
         # Get selected row
-        income_data = [i.data() for i in self.tree_income.selectedIndexes()]
+        income_data = selected_ledger_row(self.tree_income)
         if len(income_data) > 0:
             dlg = ConfirmDialog(title="Potvrdi brisanje", list_label=income_data, styletext=self.styleSheet())
             if dlg.exec():
                 entry_id = income_data[6]
                 try:
-                    fn.update_database(settings.get_setting("database"), f"DELETE FROM income WHERE ID = {entry_id}")
+                    fn.update_database(settings.get_setting("database"), "DELETE FROM income WHERE id = ?",
+                                       (int(entry_id),))
+                    self.apply_entry_change("income", entry_id=entry_id)
                 except Exception as err:
                     logging.critical(f"Critical error: {err}")
         else:
             fn.popup_message(text="Označi stavku za brisanje", title="Warning", style=self.styleSheet()).exec()
 
-        self.click_btn_show()
-
     # Outcome button actions
     def click_outcome_btn1(self):
         """Opens new outcome entry dialog"""
@@ -551,7 +787,7 @@ class UI(QWidget):
         logging.info("Edit outcome dialog opened")
 
         # Get selected row
-        selected_row = [i.data() for i in self.tree_outcome.selectedIndexes()]
+        selected_row = selected_ledger_row(self.tree_outcome)
 
         # if row selected
         if len(selected_row) > 0:
@@ -567,7 +803,7 @@ class UI(QWidget):
         logging.info("Delete outcome button pressed")
 
         # Get selected row
-        selected_row = [i.data() for i in self.tree_outcome.selectedIndexes()]
+        selected_row = selected_ledger_row(self.tree_outcome)
 
         # Delete entry by ID
         if len(selected_row) > 0:
@@ -575,14 +811,14 @@ class UI(QWidget):
             dlg = ConfirmDialog(title="Potvrdi brisanje", list_label=selected_row, styletext=self.styleSheet())
             if dlg.exec():
                 try:
-                    fn.update_database(settings.get_setting("database"), f"DELETE FROM outcome WHERE ID = {entry_id}")
+                    fn.update_database(settings.get_setting("database"), "DELETE FROM outcome WHERE id = ?",
+                                       (int(entry_id),))
+                    self.apply_entry_change("outcome", entry_id=entry_id)
                 except Exception as err:
                     logging.critical(f"Critical error: {err}")
         else:
             fn.popup_message(text="Označi stavku za brisanje", title="Warning", style=self.styleSheet()).exec()
 
-        self.click_btn_show()
-
     # Table buttons actions
     def click_browse_btn(self):
         """Browse for bank report"""
@@ -591,29 +827,45 @@ class UI(QWidget):
         path = QFileDialog.getOpenFileName(self, "Open file", ".", "Izvod (*.txt)")[0]
         if path != "":
             self.file_path.setText(path)
-            data, report_year = fn.decode_input_file(path)
-            for row in data:
+            try:
+                self.show_statement(path)
+            except (OSError, statement.StatementError) as err:
+                logging.error(f"Bank report {path} not loaded: {err}")
+                fn.popup_message(text=f"Greška pri čitanju izvoda:\n{err}", title="Greška",
+                                 style=self.styleSheet()).exec()
+
+    def show_statement(self, path):
+        """Add transactions from bank report to input table - table is filled only if whole report is read"""
+        records = list(statement.read_statement(path))
+        report_year = report_number = None
+
+        for record in records:
+            if isinstance(record, statement.FileHeader):
+                report_year = record.year
+            elif isinstance(record, statement.StatementHeader):
+                report_number = record.number
+            elif isinstance(record, statement.Transaction):
                 # Income/outcome combobox
                 combobox = QComboBox()
                 combobox.addItems(["Prihod", "Rashod"])
-                combobox.setCurrentText(str(row[0]))
+                combobox.setCurrentText(record.direction)
 
                 # Code combobox
                 combobox_code = QComboBox()
-                if row[0] == "Prihod":
+                if record.direction == "Prihod":
                     combobox_code.addItems(settings.get_income_codes())
-                elif row[0] == "Rashod":
+                elif record.direction == "Rashod":
                     combobox_code.addItems(settings.get_outcome_codes())
 
                 # Amount with LineEdit
-                amount_edit = QLineEdit(str(row[2]))
+                amount_edit = QLineEdit(str(record.amount))
                 amount_edit.setValidator(
                     QRegularExpressionValidator(QRegularExpression("\d{1,10}[.]\d\d"), amount_edit))
 
                 # DateEdit
                 date_edit = QDateEdit()
                 date_edit.setCalendarPopup(True)
-                date_edit.setDate(QDate.fromString(str(row[3]), "d.M.yyyy."))
+                date_edit.setDate(QDate(record.date.year, record.date.month, record.date.day))
 
                 irow = self.io_table.rowCount()
 
@@ -623,8 +875,8 @@ class UI(QWidget):
                 self.io_table.setCellWidget(irow, 3, amount_edit)
                 self.io_table.setCellWidget(irow, 4, date_edit)
 
-                self.io_table.setItem(irow, 2, QTableWidgetItem(str(row[1])))
-                self.io_table.setItem(irow, 5, QTableWidgetItem(f"Izvod br. {row[4]}/{report_year}"))
+                self.io_table.setItem(irow, 2, QTableWidgetItem(record.description))
+                self.io_table.setItem(irow, 5, QTableWidgetItem(f"Izvod br. {report_number}/{report_year}"))
 
     def click_add_row(self):
         """Add row to table"""
@@ -671,49 +923,88 @@ class UI(QWidget):
 
         logging.info("Income/outcome table - Save button pressed")
 
-        # Create query for every row
         if self.io_table.rowCount() == 0:
             # If there is no data to save - popup message
             fn.popup_message("Nema podataka za spremanje!", style=self.styleSheet()).exec()
-        else:
-            # Get row count
-            for irow in range(self.io_table.rowCount()):
-                if self.io_table.cellWidget(irow, 0).currentText() == "Prihod":
-                    table = "income"
-                elif self.io_table.cellWidget(irow, 0).currentText() == "Rashod":
-                    table = "outcome"
-                else:
-                    table = None
+            return
 
-                # Put item to table
-                code = self.io_table.cellWidget(irow, 1).currentText()
-                code_desc = settings.get_code_desc(table, code)
-                desc = self.io_table.item(irow, 2).text()
-                amount = self.io_table.cellWidget(irow, 3).text()
-                day = self.io_table.cellWidget(irow, 4).date().toPyDate()
-                remark = self.io_table.item(irow, 5).text()
-                entry_id = fn.set_id(settings.get_setting("database"), table)
+        # Validate every row before anything is saved
+        rows, errors = self.collect_table_rows()
+        if errors:
+            logging.info(f"Income/outcome table not saved - {len(errors)} invalid rows")
+            fn.popup_message("Podaci nisu spremljeni. Neispravni redovi:\n\n" + "\n".join(errors),
+                             title="Pogrešan upis", style=self.styleSheet()).exec()
+            return
 
-                # Create query
-                query = f"INSERT INTO {table}(code, code_desc, desc, amount, day, remark, id) VALUES " \
-                        f"({code}, '{code_desc}', '{desc}', {amount}, '{day}', '{remark}', {entry_id})"
+        # Save all rows in one transaction - all or nothing
+        database = settings.get_setting("database")
+        try:
+            with db.transaction(database) as conn:
+                for table, table_rows in rows.items():
+                    if not table_rows:
+                        continue
+                    ids = db.reserve_ids(database, table, len(table_rows))
+                    conn.executemany(f"INSERT INTO {table}(code, code_desc, desc, amount, day, remark, id) "
+                                     f"VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     [row + (entry_id,) for row, entry_id in zip(table_rows, ids)])
+        except Exception as err:
+            logging.error(f"Income/outcome table not saved: {err}")
+            fn.popup_message(f"Greška pri spremanju podataka, ništa nije spremljeno:\n{err}",
+                             title="Greška", style=self.styleSheet()).exec()
+            return
+
+        logging.info(f"Income/outcome saved to database: {len(rows['income'])} income, "
+                     f"{len(rows['outcome'])} outcome rows")
 
-                # Execute query
-                fn.save_data(settings.get_setting("database"), query)
+        # Show dialog
+        fn.popup_message("Podaci iz tablice upisani u bazu podataka", style=self.styleSheet()).exec()
 
-                logging.info(f"Income/outcome saved to database: {query}")
+        # Clear the table
+        self.io_table.setRowCount(0)
 
-            # Show dialog
-            fn.popup_message("Podaci iz tablice upisani u bazu podataka", style=self.styleSheet()).exec()
+        # Refresh all trees and reports
+        self.click_btn_show()
 
-            # Clear the table
-            self.io_table.setRowCount(0)
+        # Take care of bank report filepath
+        self.file_path.setText("Odaberi izvod")
 
-            # Refresh all trees and reports
-            self.click_btn_show()
+    def collect_table_rows(self):
+        """
+        Read and validate income/outcome table rows
+
+        returns: dict table -> list of (code, code_desc, desc, amount, day, remark), list of row errors
+        """
+        tables = {"Prihod": "income", "Rashod": "outcome"}
+
+        rows = {"income": [], "outcome": []}
+        errors = []
+        for irow in range(self.io_table.rowCount()):
+            table = tables.get(self.io_table.cellWidget(irow, 0).currentText())
+            code = self.io_table.cellWidget(irow, 1).currentText()
+            desc = self.io_table.item(irow, 2).text().strip() if self.io_table.item(irow, 2) else ""
+            amount = self.io_table.cellWidget(irow, 3).text().strip()
+            day = self.io_table.cellWidget(irow, 4).date().toPyDate()
+            remark = self.io_table.item(irow, 5).text() if self.io_table.item(irow, 5) else ""
+
+            # Input control
+            if table is None:
+                errors.append(f"Red {irow + 1}: nepoznata vrsta (prihod/rashod)")
+                continue
+            if not settings.catalog.has_code(table, code):
+                errors.append(f"Red {irow + 1}: nepoznata šifra {code}")
+                continue
+            if desc == "":
+                errors.append(f"Red {irow + 1}: nedostaje opis")
+                continue
+            try:
+                amount = float(amount)
+            except ValueError:
+                errors.append(f"Red {irow + 1}: neispravan iznos '{amount}'")
+                continue
+
+            rows[table].append((int(code), settings.catalog.description(table, code), desc, amount, str(day), remark))
 
-            # Take care of bank report filepath
-            self.file_path.setText("Odaberi izvod")
+        return rows, errors
 
     def click_clear_btn(self):
         """Removes all rows from input/output table and changes filename"""
@@ -723,66 +1014,37 @@ class UI(QWidget):
 
     @classmethod
     def create_query(cls, table, data_from, data_to, code="0"):
-        """Create query for retriving data from database"""
+        """Create query and its parameters for retriving data from database - returns (query, params)"""
+        period = (str(data_from), str(data_to + datetime.timedelta(days=1)))  # Whole days, both inclusive
         if code == "0":
-            return f"SELECT * FROM {table} WHERE day >= '{data_from} 00:00:00' AND day <= '{data_to} 00:00:00'"
+            return f"SELECT * FROM {table} WHERE day >= ? AND day < ?", period
         else:
-            return f"SELECT * FROM {table} WHERE day >= '{data_from} 00:00:00' AND day<= '{data_to} 00:00:00' " \
-                   f"AND code = {code}"
+            return f"SELECT * FROM {table} WHERE day >= ? AND day < ? AND code = ?", period + (int(code),)
 
-    def create_report_data(self, date_from, date_to):
+    @classmethod
+    def create_report_data(cls, database, settings_file, date_from, date_to):
         """
         Creates list of data for creating reports
 
         keyword:
-        QDateEdit data_from
-        QDateEdit data_to
+        str database - ledger database
+        str settings_file - settings database with code descriptions
+        date data_from
+        date data_to
 
         returns: list of data
         """
-        sum_income = []
-        for code in settings.get_income_codes():
-            if code == "13":
-                continue
-            total = 0.0
-            code_data = fn.get_data_from_database(settings.get_setting("database"),
-                                                  self.create_query("income", date_from, date_to, code))
-            for icode in code_data:
-                total += float(icode[3])
-            sum_income.append([code, settings.get_code_desc("income", code), total])
-
-        sum_outcome = []
-        for code in settings.get_outcome_codes():
-            if code == "21":
-                continue
-            total = 0.0
-            code_data = fn.get_data_from_database(settings.get_setting("database"),
-                                                  self.create_query("outcome", date_from, date_to, code))
-            for icode in code_data:
-                total += float(icode[3])
-            sum_outcome.append([code, settings.get_code_desc("outcome", code), total])
+        sum_income = fn.calculate_code_totals(database, settings_file, "income", date_from, date_to,
+                                              excluded=REPORT_EXCLUDED_CODES["income"])
+        sum_outcome = fn.calculate_code_totals(database, settings_file, "outcome", date_from, date_to,
+                                               excluded=REPORT_EXCLUDED_CODES["outcome"])
 
         return sum_income, sum_outcome
 
     @classmethod
     def update_tree_list(cls, tree, data):
-        """Puts income/outcome data into tree list"""
-        tree.clear()
-
-        for row in data:
-            # Takes care of tuples
-            row = list(row)
-
-            # For trees with different column numbers
-            if len(row) == 3:
-                row[2] = f"{row[2]:,.2f}"
-            elif len(row) == 7:
-                row[3] = f"{row[3]:,.2f}"
-            else:
-                logging.info("FORMATING FAILED")
-
-            # Puts data into tree widget
-            QTreeWidgetItem(tree, [str(i) for i in row])
+        """Puts income/outcome data into tree list - cells are formatted by model when displayed"""
+        tree.model().set_rows(data)
 
     @classmethod
     def calculate_total(cls, data):
@@ -798,21 +1060,8 @@ class UI(QWidget):
     def keyPressEvent(self, event):
         """KeyPressEvents"""
         if event.modifiers() == Qt.KeyboardModifier.ControlModifier:
-            if event.key() == Qt.Key.Key_F1:
-                self.setStyleSheet(fn.create_stylesheet("Default"))
-                # Add link formating function
-            if event.key() == Qt.Key.Key_F2:
-                self.setStyleSheet(fn.create_stylesheet("BlueGreyLight"))
-            if event.key() == Qt.Key.Key_F3:
-                self.setStyleSheet(fn.create_stylesheet("BlueGreyDark"))
-            if event.key() == Qt.Key.Key_F4:
-                self.setStyleSheet(fn.create_stylesheet("WarmGrey"))
-            if event.key() == Qt.Key.Key_F5:
-                self.setStyleSheet(fn.create_stylesheet("CoolGrey"))
-            if event.key() == Qt.Key.Key_F6:
-                self.setStyleSheet(fn.create_stylesheet("DarkRed"))
-            if event.key() == Qt.Key.Key_F7:
-                self.setStyleSheet(fn.create_stylesheet("Green"))
+            if event.key() in THEME_KEYS:
+                self.apply_theme(THEME_KEYS[event.key()])
         else:
             if event.key() == Qt.Key.Key_Home:
                 self.tabWidget.setCurrentIndex(0)
@@ -868,9 +1117,7 @@ class UI(QWidget):
 
     def change_links_format(self, style="Default"):
         """Change links format"""
-        # Get all links
-        # Change style
-        print(style)
+        self.links_widget.set_style(style)
 
 
 # Income classes
@@ -882,7 +1129,7 @@ class IncomeInputDialog(QDialog):
 
         super().__init__()
         self.parent = parent
-        uic.loadUi("ui/inputdialog.ui", self)
+        load_ui("ui/inputdialog.ui", self)
         self.setStyleSheet(parent.styleSheet())
         self.setWindowTitle("Upis prihoda")
 
@@ -894,18 +1141,13 @@ class IncomeInputDialog(QDialog):
         self.btn_close.clicked.connect(lambda x: (self.close(), logging.info("New income dialog closed")))
 
         # Combo box
-        icodes = fn.get_data_from_database(settings.file, "SELECT * FROM income")
-        self.code.addItems([str(i[0]) for i in icodes])
+        self.code.addItems(settings.catalog.items["income"])
 
         self.code.activated.connect(lambda: (
-            self.code_desc.setText(fn.get_data_from_database(
-                settings.file,
-                f"SELECT * FROM income WHERE code = '{self.code.currentText()}'")[0][1])
+            self.code_desc.setText(settings.catalog.description("income", self.code.currentText()))
         ))
 
-        self.code_desc.setText(fn.get_data_from_database(
-            settings.file,
-            f"SELECT * FROM income WHERE code = '{self.code.currentText()}'")[0][1])
+        self.code_desc.setText(settings.catalog.description("income", self.code.currentText()))
 
         # Set Validator - allow only numbers and decimal point
         self.amount.setValidator(QRegularExpressionValidator(QRegularExpression("\d{1,10}[.]\d\d"), self.amount))
@@ -923,8 +1165,7 @@ class IncomeInputDialog(QDialog):
         remark = self.remark.text()
         entry_id = fn.set_id(settings.get_setting("database"), "income")
 
-        query = f"INSERT INTO income(code, code_desc, desc, amount, day, remark, id) VALUES " \
-                f"({code}, '{code_desc}', '{desc}', {amount}, '{date}', '{remark}', {entry_id})"
+        query = "INSERT INTO income(code, code_desc, desc, amount, day, remark, id) VALUES (?, ?, ?, ?, ?, ?, ?)"
 
         # Input control
         if desc.strip() == "" or amount.strip() == "":
@@ -933,13 +1174,13 @@ class IncomeInputDialog(QDialog):
             mb.exec()
         else:
             try:
-                fn.save_data(database_path=settings.get_setting("database"), query=query)
-                logging.info(f"Saved to database: {query}")
+                params = (int(code), code_desc, desc, float(amount), str(date), remark, entry_id)
+                fn.save_data(database_path=settings.get_setting("database"), query=query, params=params)
+                logging.info(f"Saved to database: income {params}")
+                self.parent.apply_entry_change("income", new_row=params)
             except Exception as err:
                 logging.critical(f"Critical error: {err}")
 
-            self.parent.click_btn_show()
-
             self.close()
             logging.info("Income saved to database")
 
@@ -952,7 +1193,7 @@ class IncomeEditDialog(QDialog):
 
         super().__init__()
         self.parent = parent
-        uic.loadUi("ui/inputdialog.ui", self)
+        load_ui("ui/inputdialog.ui", self)
         self.setStyleSheet(parent.styleSheet())
         self.setWindowTitle("Promjena podataka prihoda")
 
@@ -962,18 +1203,13 @@ class IncomeEditDialog(QDialog):
 
         # Combo box
 
-        icodes = fn.get_data_from_database(settings.file, "SELECT * FROM income")
-        self.code.addItems([str(i[0]) for i in icodes])
+        self.code.addItems(settings.catalog.items["income"])
         self.code.setCurrentText(income_data[0])
 
-        self.code_desc.setText(fn.get_data_from_database(
-            settings.file,
-            f"SELECT * FROM income WHERE code = '{self.code.currentText()}'")[0][1])
+        self.code_desc.setText(settings.catalog.description("income", self.code.currentText()))
 
         self.code.activated.connect(lambda: (
-            self.code_desc.setText(fn.get_data_from_database(
-                settings.file,
-                f"SELECT * FROM income WHERE code = '{self.code.currentText()}'")[0][1])))
+            self.code_desc.setText(settings.catalog.description("income", self.code.currentText()))))
 
         # Amount input only numbers and decimal point
         self.amount.setValidator(QRegularExpressionValidator(QRegularExpression("\d{1,10}[.]\d\d"), self.amount))
@@ -1008,17 +1244,16 @@ class IncomeEditDialog(QDialog):
         else:
             try:
                 # Create query
-                query = f"UPDATE income SET code = {code}, code_desc = '{code_desc}', desc = '{desc}', " \
-                        f"amount = {amount}, day = '{date}', remark = '{remark}' WHERE id = {entry_id}"
+                query = "UPDATE income SET code = ?, code_desc = ?, desc = ?, amount = ?, day = ?, remark = ? " \
+                        "WHERE id = ?"
+                params = (int(code), code_desc, desc, float(amount), str(date), remark, int(entry_id))
                 # Save to database
-                fn.update_database(database_path=settings.get_setting("database"), query=query)
+                fn.update_database(database_path=settings.get_setting("database"), query=query, params=params)
                 logging.debug(f"Update made for income id = {entry_id}")
+                self.parent.apply_entry_change("income", entry_id=entry_id, new_row=params)
             except Exception as err:
                 logging.critical(f"Critical error: {err}")
 
-            # Update everything
-            self.parent.click_btn_show()
-
             # Close Edit dialog
             self.close()
 
@@ -1032,7 +1267,7 @@ class OutcomeInputDialog(QDialog):
 
         super().__init__()
         self.parent = parent
-        uic.loadUi("ui/inputdialog.ui", self)
+        load_ui("ui/inputdialog.ui", self)
         self.setStyleSheet(parent.styleSheet())
         self.setWindowTitle("Upis rashoda")
 
@@ -1048,20 +1283,15 @@ class OutcomeInputDialog(QDialog):
 
         # Combo box
         code_combo = self.__getattribute__("code")
-        icodes = fn.get_data_from_database(settings.file, "SELECT * FROM outcome")
-        code_combo.addItems([str(i[0]) for i in icodes])
+        code_combo.addItems(settings.catalog.items["outcome"])
 
         code_desc = self.__getattribute__("code_desc")
 
         code_combo.activated.connect(lambda: (
-            code_desc.setText(fn.get_data_from_database(
-                settings.file,
-                f"SELECT * FROM outcome WHERE code = '{code_combo.currentText()}'")[0][1])
+            code_desc.setText(settings.catalog.description("outcome", code_combo.currentText()))
         ))
 
-        code_desc.setText(fn.get_data_from_database(
-            settings.file,
-            f"SELECT * FROM outcome WHERE code = '{code_combo.currentText()}'")[0][1])
+        code_desc.setText(settings.catalog.description("outcome", code_combo.currentText()))
 
         amount = self.__getattribute__("amount")
         amount.setValidator(QRegularExpressionValidator(QRegularExpression("\d{1,10}[.]\d\d"), amount))
@@ -1086,16 +1316,15 @@ class OutcomeInputDialog(QDialog):
             mb.exec()
         else:
             # Create query
-            query = f"INSERT INTO outcome(code, code_desc, desc, amount, day, remark, id) VALUES " \
-                    f"({code}, '{code_desc}', '{desc}', {amount}, '{date}', '{remark}', {entry_id})"
+            query = "INSERT INTO outcome(code, code_desc, desc, amount, day, remark, id) VALUES (?, ?, ?, ?, ?, ?, ?)"
             try:
-                fn.save_data(database_path=settings.get_setting("database"), query=query)
-                logging.info(f"Saved to database: {query}")
+                params = (int(code), code_desc, desc, float(amount), str(date), remark, entry_id)
+                fn.save_data(database_path=settings.get_setting("database"), query=query, params=params)
+                logging.info(f"Saved to database: outcome {params}")
+                self.parent.apply_entry_change("outcome", new_row=params)
             except Exception as err:
                 logging.critical(f"Critical error: {err}")
 
-            self.parent.click_btn_show()
-
             self.close()
             logging.info("Outocome saved to database")
 
@@ -1108,7 +1337,7 @@ class OutcomeEditDialog(QDialog):
 
         super().__init__()
         self.parent = parent
-        uic.loadUi("ui/inputdialog.ui", self)
+        load_ui("ui/inputdialog.ui", self)
         self.setStyleSheet(parent.styleSheet())
         self.setWindowTitle("Promjena podataka rashoda")
 
@@ -1122,18 +1351,13 @@ class OutcomeEditDialog(QDialog):
         code_combo = self.__getattribute__("code")
         code_desc = self.__getattribute__("code_desc")
 
-        icodes = fn.get_data_from_database(settings.file, "SELECT * FROM outcome")
-        code_combo.addItems([str(i[0]) for i in icodes])
+        code_combo.addItems(settings.catalog.items["outcome"])
         code_combo.setCurrentText(outcome_data[0])
 
-        code_desc.setText(fn.get_data_from_database(
-            settings.file,
-            f"SELECT * FROM outcome WHERE code = '{code_combo.currentText()}'")[0][1])
+        code_desc.setText(settings.catalog.description("outcome", code_combo.currentText()))
 
         code_combo.activated.connect(lambda: (
-            code_desc.setText(fn.get_data_from_database(
-                settings.file,
-                f"SELECT * FROM outcome WHERE code = '{code_combo.currentText()}'")[0][1])
+            code_desc.setText(settings.catalog.description("outcome", code_combo.currentText()))
         ))
 
         # Amount input only numbers and decimal point
@@ -1176,17 +1400,16 @@ class OutcomeEditDialog(QDialog):
         else:
             try:
                 # Create query
-                query = f"UPDATE outcome SET code = {code}, code_desc = '{code_desc}', desc = '{desc}', " \
-                        f"amount = {amount}, day = '{date}', remark = '{remark}' WHERE id = {entry_id}"
+                query = "UPDATE outcome SET code = ?, code_desc = ?, desc = ?, amount = ?, day = ?, remark = ? " \
+                        "WHERE id = ?"
+                params = (int(code), code_desc, desc, float(amount), str(date), remark, int(entry_id))
                 # Save to database
-                fn.update_database(database_path=settings.get_setting("database"), query=query)
+                fn.update_database(database_path=settings.get_setting("database"), query=query, params=params)
                 logging.debug(f"Update made for outcome id = {entry_id}")
+                self.parent.apply_entry_change("outcome", entry_id=entry_id, new_row=params)
             except Exception as err:
                 logging.critical(f"Critical error: {err}")
 
-            # Update everything
-            self.parent.click_btn_show()
-
             # Close Edit dialog
             self.close()
 
@@ -1199,7 +1422,7 @@ class HelpWidget(QDialog):
         """Constructor"""
 
         super().__init__()
-        uic.loadUi("ui/help.ui", self)
+        load_ui("ui/help.ui", self)
 
         self.setStyleSheet(parent.styleSheet())
         self.setWindowTitle("Pomoć")
@@ -1224,14 +1447,14 @@ class CodeViewer(QDialog):
         """Constructor"""
 
         super().__init__()
-        uic.loadUi("ui/codeviewer.ui", self)
+        load_ui("ui/codeviewer.ui", self)
         self.setStyleSheet(parent.styleSheet())
 
         income_tree = self.__getattribute__("tree_income")
         outcome_tree = self.__getattribute__("tree_outcome")
 
-        icodes = fn.get_data_from_database(settings.file, "SELECT * FROM income")
-        ocodes = fn.get_data_from_database(settings.file, "SELECT * FROM outcome")
+        icodes = settings.catalog.rows("income")
+        ocodes = settings.catalog.rows("outcome")
 
         income_tree.clear()
         for ic in icodes:
@@ -1254,7 +1477,7 @@ class LogViewer(QDialog):
 
     def __init__(self, parent):
         super().__init__()
-        uic.loadUi("ui/logview.ui", self)
+        load_ui("ui/logview.ui", self)
         self.setStyleSheet(parent.styleSheet())
         self.setWindowTitle("Log view")
 
@@ -1274,7 +1497,7 @@ class SettingsEdit(QDialog):
 
     def __init__(self, parent):
         super().__init__(parent=parent)
-        uic.loadUi("ui/configedit.ui", self)
+        load_ui("ui/configedit.ui", self)
         self.setWindowTitle("Settings edit")
 
         # Button actions
@@ -1307,6 +1530,7 @@ class SettingsEdit(QDialog):
         self.last_modified.setDate(QDate.fromString(settings_from_db[6][1], "d.M.yyyy."))
         self.version.setText(settings_from_db[5][1])
         self.style.setCurrentText(settings_from_db[7][1])
+        self.chart_backend.setCurrentText(dict(settings_from_db).get("chart_backend", "matplotlib"))
 
         # Get Functions / Tabs
         self.graphics.setChecked(bool(int(settings_from_db[8][1])))
@@ -1322,43 +1546,29 @@ class SettingsEdit(QDialog):
 
         # Save every setting
         try:
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{self.db_path.text()}' WHERE setting='database'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{self.log_path.text()}' WHERE setting='log_filename'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{self.log_level.currentText()}' WHERE setting='log_level'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{self.log_format.text()}' WHERE setting='log_format'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{self.version.text()}' WHERE setting='version'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{self.last_modified.text()}' WHERE setting='last_modified'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{self.style.currentText()}' WHERE setting='style'")
-
-            # Functions
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{1 if self.graphics.isChecked() else 0}'"
-                               f"WHERE setting='graphics'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{1 if self.statistics.isChecked() else 0}'"
-                               f"WHERE setting='statistics'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{1 if self.income.isChecked() else 0}'"
-                               f"WHERE setting='income'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{1 if self.outcome.isChecked() else 0}'"
-                               f"WHERE setting='outcome'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{1 if self.report.isChecked() else 0}'"
-                               f"WHERE setting='report'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{1 if self.table.isChecked() else 0}'"
-                               f"WHERE setting='table'")
-            fn.update_database(settings.file,
-                               f"UPDATE settings SET value='{1 if self.bills.isChecked() else 0}'"
-                               f"WHERE setting='bills'")
+            values = {
+                "database": self.db_path.text(),
+                "log_filename": self.log_path.text(),
+                "log_level": self.log_level.currentText(),
+                "log_format": self.log_format.text(),
+                "version": self.version.text(),
+                "last_modified": self.last_modified.text(),
+                "style": self.style.currentText(),
+                "chart_backend": self.chart_backend.currentText(),
+
+                # Functions
+                "graphics": 1 if self.graphics.isChecked() else 0,
+                "statistics": 1 if self.statistics.isChecked() else 0,
+                "income": 1 if self.income.isChecked() else 0,
+                "outcome": 1 if self.outcome.isChecked() else 0,
+                "report": 1 if self.report.isChecked() else 0,
+                "table": 1 if self.table.isChecked() else 0,
+                "bills": 1 if self.bills.isChecked() else 0,
+            }
+
+            for setting, value in values.items():
+                fn.update_database(settings.file, "UPDATE settings SET value = ? WHERE setting = ?",
+                                   (str(value), setting))
 
             logging.info("Settings saved to database")
         except Exception as error:
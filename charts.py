@@ -0,0 +1,288 @@
+"""
+Graph backends for Finance Manager v3
+
+Imported when graphs are shown for the first time - matplotlib is loaded with this module, pyqtgraph only when
+its backend is used.
+"""
+import logging
+from math import ceil
+
+from PyQt6.QtGui import QColor
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.dates import MONTHLY, DateFormatter, rrulewrapper, RRuleLocator, date2num
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+from functions import style_colors
+
+
+def chart_colors(style, palette):
+    """Graph colors - taken from application style, from palette for Default style; returns dict"""
+    colors = style_colors(style)
+    background = QColor(colors["background"] if colors else palette.base().color().name())
+    text = QColor(colors["text"] if colors else palette.text().color().name())
+
+    def shade(color, amount):
+        """Color components changed by amount - RGB floats"""
+        return tuple([max(0.0, min(1.0, i + amount)) for i in color.getRgbF()[0:3]])
+
+    if text.getRgbF()[0] > 0.51:
+        bars = [shade(text, -0.2), shade(text, -0.3), shade(text, -0.4)]
+        grid = shade(background, 0.05)
+    else:
+        bars = [shade(text, 0.3), shade(text, 0.2), shade(text, 0.1)]
+        grid = shade(background, -0.05)
+
+    if background.getRgbF() in [(1.0, 1.0, 1.0, 1.0), (0.6872549176216125, 0.7500000119209289, 0.8127451062202453)]:
+        grid = "grey"
+
+    return {"background": background.name(), "text": text.name(), "bars": bars, "grid": grid}
+
+
+class MatplotlibCharts:
+    """
+    Matplotlib graph backend.
+
+    One Figure (not pyplot state) for each graph, created when first shown. New period data is put into existing
+    lines, yearly bars get new heights, so refresh does not create new figures.
+    """
+
+    def __init__(self, colors):
+        """Constructor"""
+        self.colors = colors
+        self.figures = {}
+        self.canvases = {}
+        self.lines = {}
+        self.bars = []
+        self.blit_background = None
+
+    def style_axes(self, ax, title, grid, **grid_style):
+        """Colors, labels and grid of axes"""
+        text = self.colors["text"]
+        ax.set_facecolor(self.colors["background"])
+        ax.set_ylabel("\N{euro sign}", color=text)
+        ax.set_title(title, color=text)
+        ax.grid(True, color=grid, **grid_style)
+        ax.yaxis.set_tick_params(colors=text)
+
+        # Frame color
+        for spine in ax.spines.values():
+            spine.set_color(text)
+
+    def create_period_figure(self):
+        """Figure with income and outcome lines for chosen period"""
+        text = self.colors["text"]
+        figure = Figure(facecolor=self.colors["background"])
+        figure.subplots_adjust(hspace=.5)
+        canvas = FigureCanvasQTAgg(figure)
+
+        # Manage date ticks
+        loc = RRuleLocator(rrulewrapper(MONTHLY, interval=1))
+        formatter = DateFormatter("%b")
+
+        for position, (table, title) in enumerate([("income", "PRIHODI"), ("outcome", "RASHODI")]):
+            ax = figure.add_subplot(2, 1, position + 1)
+            self.style_axes(ax, title, text)
+
+            # Draw ticks on x axes
+            ax.xaxis.set_major_locator(loc)
+            ax.xaxis.set_major_formatter(formatter)
+            ax.xaxis.set_tick_params(rotation=30, labelsize=10, colors=text)
+            ax.xaxis_date()
+
+            # Line is drawn by blitting - not part of stored background
+            self.lines[table] = ax.plot([], [], "-", color=text, animated=True)[0]
+
+        canvas.mpl_connect("draw_event", self.store_blit_background)
+        self.figures["period"] = figure
+        self.canvases["period"] = canvas
+
+    def store_blit_background(self, event):
+        """Full redraw of period figure - store background without lines and draw lines on it"""
+        self.blit_background = self.canvases["period"].copy_from_bbox(self.figures["period"].bbox)
+        for line in self.lines.values():
+            line.axes.draw_artist(line)
+
+    def period(self, period_data):
+        """Put period data {table: (dates, totals)} into income and outcome lines - returns canvas widget"""
+        if "period" not in self.figures:
+            self.create_period_figure()
+        canvas = self.canvases["period"]
+
+        # set_ylim
+        try:
+            ylim = max([max(totals) for _, totals in period_data.values()])
+            ylim = ceil(ylim / 1000) * 1000
+        except Exception as e:
+            logging.info(e)
+            logging.info("Setting ylim to 2000")
+            ylim = 2000
+
+        limits_changed = False
+        for table, line in self.lines.items():
+            dates, totals = period_data[table]
+            line.set_data(dates, totals)
+
+            ax = line.axes
+            xlim = (date2num(dates[0]), date2num(dates[-1])) if dates else ax.get_xlim()
+            if xlim[0] == xlim[1]:
+                xlim = (xlim[0] - 1, xlim[1] + 1)
+            if tuple(ax.get_xlim()) != xlim or tuple(ax.get_ylim()) != (0, ylim):
+                ax.set_xlim(xlim)
+                ax.set_ylim([0, ylim])
+                limits_changed = True
+
+        if limits_changed or self.blit_background is None:
+            # Axes changed - full redraw
+            canvas.draw_idle()
+        else:
+            # Only lines changed - redraw them over stored background
+            canvas.restore_region(self.blit_background)
+            for line in self.lines.values():
+                line.axes.draw_artist(line)
+            canvas.blit(self.figures["period"].bbox)
+
+        return canvas
+
+    def create_yearly_figure(self):
+        """Figure for income, outcome and profit bars by year"""
+        figure = Figure(facecolor=self.colors["background"])
+        self.canvases["yearly"] = FigureCanvasQTAgg(figure)
+        self.figures["yearly"] = figure
+
+        ax = figure.add_subplot()
+        self.style_axes(ax, "PRIHODI I RASHODI", self.colors["grid"], linestyle='--')
+        ax.xaxis.set_tick_params(colors=self.colors["text"])
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda value, _: f"{value:,.0f}"))
+
+    def yearly(self, yearly_data):
+        """Draw income, outcome and profit bars from yearly data (years, income, outcome) - returns canvas"""
+        if "yearly" not in self.figures:
+            self.create_yearly_figure()
+        canvas = self.canvases["yearly"]
+
+        years, income_per_year, outcome_per_year = yearly_data
+        diff = [income - outcome for income, outcome in zip(income_per_year, outcome_per_year)]
+        heights = [income_per_year, outcome_per_year, diff]
+
+        # Bar with
+        bar_width = 0.25
+        ax = self.figures["yearly"].axes[0]
+
+        if self.bars and len(self.bars[0]) == len(years) and \
+                [round(rect.get_x() + bar_width * 1.5) for rect in self.bars[0]] == years:
+            # Same years - change bar heights
+            for bars, values in zip(self.bars, heights):
+                for rect, value in zip(bars, values):
+                    rect.set_height(value)
+        else:
+            # Years changed - new bars
+            for bars in self.bars:
+                bars.remove()
+            self.bars = [ax.bar([year + offset for year in years], values, color=color, width=bar_width)
+                         for offset, values, color in zip([-bar_width, 0, bar_width], heights, self.colors["bars"])]
+            if years:
+                ax.set_xlim([min(years) - 1, max(years) + 1])
+
+        # Set limits
+        ylim = max(income_per_year + outcome_per_year, default=0)
+        ax.set_ylim([0, ceil(ylim / 1000) * 1000 * 1.1 or 2000])
+
+        canvas.draw_idle()
+        return canvas
+
+    def save(self, chart, path):
+        """Save shown graph (period OR yearly) to PNG file - lines drawn by blitting are included"""
+        figure = self.figures[chart]
+        animated = [line for line in self.lines.values() if line.figure is figure]
+        for line in animated:
+            line.set_animated(False)
+        figure.savefig(path, facecolor=figure.get_facecolor())
+        for line in animated:
+            line.set_animated(True)
+
+    def close(self):
+        """Release figures - figures are not registered in pyplot, clearing them frees all artists"""
+        for figure in self.figures.values():
+            figure.clear()
+        self.figures, self.canvases, self.lines, self.bars = {}, {}, {}, []
+        self.blit_background = None
+
+
+class PyqtgraphCharts:
+    """pyqtgraph graph backend - plots are painted by Qt and can be zoomed and moved with mouse"""
+
+    def __init__(self, colors):
+        """Constructor"""
+        self.colors = colors
+        self.widgets = {}
+        self.curves = {}
+        self.bars = []
+
+    def style_plot(self, plot, title):
+        """Colors, labels and grid of plot"""
+        text = self.colors["text"]
+        plot.setTitle(title, color=text)
+        plot.setLabel("left", "\N{euro sign}", color=text)
+        plot.showGrid(x=True, y=True, alpha=0.3)
+        for axis in ["left", "bottom"]:
+            plot.getAxis(axis).setPen(text)
+            plot.getAxis(axis).setTextPen(text)
+
+    def period(self, period_data):
+        """Put period data {table: (dates, totals)} into income and outcome curves - returns widget"""
+        import pyqtgraph as pg
+
+        if "period" not in self.widgets:
+            widget = pg.GraphicsLayoutWidget()
+            widget.setBackground(self.colors["background"])
+            for row, (table, title) in enumerate([("income", "PRIHODI"), ("outcome", "RASHODI")]):
+                plot = widget.addPlot(row=row, col=0, axisItems={"bottom": pg.DateAxisItem()})
+                self.style_plot(plot, title)
+                self.curves[table] = plot.plot(pen=pg.mkPen(self.colors["text"]))
+            self.widgets["period"] = widget
+
+        for table, curve in self.curves.items():
+            dates, totals = period_data[table]
+            curve.setData([date.timestamp() for date in dates], totals)
+            curve.getViewBox().autoRange()
+
+        return self.widgets["period"]
+
+    def yearly(self, yearly_data):
+        """Draw income, outcome and profit bars from yearly data (years, income, outcome) - returns widget"""
+        import pyqtgraph as pg
+
+        years, income_per_year, outcome_per_year = yearly_data
+        diff = [income - outcome for income, outcome in zip(income_per_year, outcome_per_year)]
+        bar_width = 0.25
+
+        heights = [income_per_year, outcome_per_year, diff]
+        positions = [[year + offset for year in years] for offset in [-bar_width, 0, bar_width]]
+
+        if "yearly" not in self.widgets:
+            widget = pg.PlotWidget(background=self.colors["background"])
+            self.style_plot(widget.getPlotItem(), "PRIHODI I RASHODI")
+            for x, values, color in zip(positions, heights, self.colors["bars"]):
+                bars = pg.BarGraphItem(x=x, height=values, width=bar_width, brush=QColor.fromRgbF(*color))
+                widget.addItem(bars)
+                self.bars.append(bars)
+            self.widgets["yearly"] = widget
+        else:
+            # Bars changed in place
+            for bars, x, values in zip(self.bars, positions, heights):
+                bars.setOpts(x=x, height=values)
+
+        self.widgets["yearly"].getPlotItem().getViewBox().autoRange()
+
+        return self.widgets["yearly"]
+
+    def close(self):
+        """Release plots"""
+        for widget in self.widgets.values():
+            widget.clear()
+        self.widgets, self.curves, self.bars = {}, {}, []
+
+
+# Graph backends selectable in settings (chart_backend)
+CHART_BACKENDS = {"matplotlib": MatplotlibCharts, "pyqtgraph": PyqtgraphCharts}
@@ -0,0 +1,346 @@
+"""
+Database access layer for Finance Manager 3.0
+"""
+import atexit
+import logging
+from contextlib import contextmanager
+import os.path
+import sqlite3
+import threading
+
+# Number of prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionManager:
+    """
+    Keeps one long-lived sqlite connection per database file.
+
+    sqlite3 connections may only be used by the thread that created them, so connections are owned by
+    (database file, thread) pairs. Background threads close their own connections (close_thread) before they
+    finish; close_all closes connections of the calling thread on shutdown. Each connection keeps one cursor that is reused for every statement
+    and a cache of prepared statements - queries should use ? placeholders so the same SQL text is reused.
+    """
+
+    def __init__(self, cached_statements=STATEMENT_CACHE_SIZE):
+        """Constructor"""
+        self.cached_statements = cached_statements
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(database_path):
+        """Connection key - normalized file path and current thread"""
+        return os.path.normcase(os.path.abspath(database_path)), threading.get_ident()
+
+    def connection(self, database_path):
+        """Returns open connection for given database - opens new one if needed"""
+        key = self._key(database_path)
+
+        with self._lock:
+            if key not in self._connections:
+                conn = sqlite3.connect(database_path, cached_statements=self.cached_statements)
+                self._connections[key] = (conn, conn.cursor())
+                logging.debug(f"Database connection opened: {database_path}")
+
+            return self._connections[key][0]
+
+    def cursor(self, database_path):
+        """Returns reusable cursor for given database"""
+        self.connection(database_path)
+        return self._connections[self._key(database_path)][1]
+
+    def close(self, database_path):
+        """Close all connections (every thread) to given database"""
+        path = self._key(database_path)[0]
+
+        with self._lock:
+            for key in [key for key in self._connections if key[0] == path]:
+                self._close_connection(key)
+
+    def close_thread(self):
+        """Close every connection opened by current thread"""
+        thread = threading.get_ident()
+
+        with self._lock:
+            for key in [key for key in self._connections if key[1] == thread]:
+                self._close_connection(key)
+
+    def close_all(self):
+        """Close every open connection - called on application shutdown"""
+        with self._lock:
+            for key in list(self._connections):
+                self._close_connection(key)
+
+    def _close_connection(self, key):
+        """Commit pending changes and close connection"""
+        conn, cursor = self._connections.pop(key)
+        try:
+            cursor.close()
+            conn.commit()
+            conn.close()
+            logging.debug(f"Database connection closed: {key[0]}")
+        except sqlite3.ProgrammingError as err:
+            # Connection owned by another thread - that thread should have called close_thread
+            logging.warning(f"Database connection not closed: {key[0]}: {err}")
+
+
+# Application wide connection manager
+manager = ConnectionManager()
+
+# Shutdown hook - also called explicitly when QApplication quits
+atexit.register(manager.close_all)
+
+
+def get_connection(database_path):
+    """Returns connection for database from application connection manager"""
+    return manager.connection(database_path)
+
+
+def get_cursor(database_path):
+    """Returns cursor for database from application connection manager"""
+    return manager.cursor(database_path)
+
+
+def close_thread():
+    """Close database connections of current thread"""
+    manager.close_thread()
+
+
+def close_all():
+    """Close all database connections"""
+    manager.close_all()
+
+
+def attach(database_path, other_path, alias):
+    """Attach other database to pooled connection under alias (once per connection) - returns connection"""
+    conn = get_connection(database_path)
+    if alias not in [row[1] for row in conn.execute("PRAGMA database_list")]:
+        conn.execute("ATTACH DATABASE ? AS " + alias, (other_path,))
+        logging.debug(f"Database {other_path} attached to {database_path} as {alias}")
+    return conn
+
+
+@contextmanager
+def transaction(database_path):
+    """Run statements on database connection in one transaction - commit on success, rollback on any error"""
+    conn = get_connection(database_path)
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+class IdAllocator:
+    """
+    Allocates entry ID numbers from the highest ID in table (MAX(id) is an index lookup on primary key).
+
+    Reserved blocks are remembered per (database file, table), so IDs handed out but not yet saved are not
+    given out twice.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, database_path, table, count=1):
+        """Reserve block of count consecutive IDs - returns range of IDs"""
+        max_id = get_connection(database_path).execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+        key = (os.path.normcase(os.path.abspath(database_path)), table)
+
+        with self._lock:
+            first = max(max_id + 1, self._next.get(key, 1))
+            self._next[key] = first + count
+
+        return range(first, first + count)
+
+
+# Application wide ID allocator
+id_allocator = IdAllocator()
+
+
+def reserve_ids(database_path, table, count=1):
+    """Reserve block of count IDs for new entries in table - returns range of IDs"""
+    return id_allocator.reserve(database_path, table, count)
+
+
+def _ledger_primary_key_statements(table):
+    """Statements rebuilding ledger table with id as INTEGER PRIMARY KEY - unique IDs are kept, missing and
+    duplicated IDs get new ones"""
+    columns = "code, code_desc, desc, amount, day, remark"
+    # First row of every ID - found in one grouped pass, not with correlated subquery per row
+    first_with_id = f"rowid IN (SELECT MIN(rowid) FROM {table} WHERE id IS NOT NULL GROUP BY id)"
+
+    return [
+        f"CREATE TABLE {table}_new(code INTEGER, code_desc TEXT, desc TEXT, amount FLOAT, day TIMESTAMP, "
+        f"remark TEXT, id INTEGER PRIMARY KEY)",
+        f"INSERT INTO {table}_new SELECT {columns}, id FROM {table} WHERE {first_with_id} ORDER BY rowid",
+        f"INSERT INTO {table}_new SELECT {columns}, NULL FROM {table} WHERE NOT {first_with_id} ORDER BY rowid",
+        f"DROP TABLE {table}",
+        f"ALTER TABLE {table}_new RENAME TO {table}",
+        f"CREATE INDEX {table}_day ON {table}(day, amount)",
+        f"CREATE INDEX {table}_code_day ON {table}(code, day, amount)",
+    ]
+
+
+# Summary tables - totals of ledger amounts per code and period, period is prefix of ledger day of given length
+TOTALS_PERIODS = {"day": 10, "month": 7, "year": 4}
+
+# Ledger amount in cents - summary tables add and subtract integers, so totals stay exact
+CENTS = "CAST(round(IFNULL({row}amount, 0) * 100) AS INTEGER)"
+
+
+def _totals_statements():
+    """Statements creating summary tables and triggers on income/outcome keeping them up to date"""
+    statements = []
+    for period in TOTALS_PERIODS:
+        statements.append(f"CREATE TABLE totals_{period}(ledger TEXT NOT NULL, period TEXT NOT NULL, "
+                          f"code INTEGER NOT NULL, cents INTEGER NOT NULL, entries INTEGER NOT NULL, "
+                          f"PRIMARY KEY (ledger, period, code)) WITHOUT ROWID")
+
+    for table in ["income", "outcome"]:
+        add, remove = [], []
+        for period, length in TOTALS_PERIODS.items():
+            add.append(f"INSERT INTO totals_{period}(ledger, period, code, cents, entries) "
+                       f"VALUES ('{table}', IFNULL(substr(NEW.day, 1, {length}), ''), IFNULL(NEW.code, 0), "
+                       f"{CENTS.format(row='NEW.')}, 1) "
+                       f"ON CONFLICT(ledger, period, code) DO UPDATE "
+                       f"SET cents = cents + excluded.cents, entries = entries + 1;")
+            old_key = f"ledger = '{table}' AND period = IFNULL(substr(OLD.day, 1, {length}), '') " \
+                      f"AND code = IFNULL(OLD.code, 0)"
+            remove.append(f"UPDATE totals_{period} SET cents = cents - {CENTS.format(row='OLD.')}, "
+                          f"entries = entries - 1 WHERE {old_key};")
+            remove.append(f"DELETE FROM totals_{period} WHERE {old_key} AND entries <= 0;")
+
+        statements.append(f"CREATE TRIGGER {table}_totals_insert AFTER INSERT ON {table} "
+                          f"BEGIN {' '.join(add)} END")
+        statements.append(f"CREATE TRIGGER {table}_totals_delete AFTER DELETE ON {table} "
+                          f"BEGIN {' '.join(remove)} END")
+        statements.append(f"CREATE TRIGGER {table}_totals_update AFTER UPDATE OF code, amount, day ON {table} "
+                          f"BEGIN {' '.join(remove + add)} END")
+
+    return statements + _totals_rebuild_statements()
+
+
+def _totals_rebuild_statements():
+    """Statements recalculating summary tables from income/outcome"""
+    statements = []
+    for period, length in TOTALS_PERIODS.items():
+        statements.append(f"DELETE FROM totals_{period}")
+        for table in ["income", "outcome"]:
+            statements.append(f"INSERT INTO totals_{period}(ledger, period, code, cents, entries) "
+                              f"SELECT '{table}', IFNULL(substr(day, 1, {length}), '') AS key_period, "
+                              f"IFNULL(code, 0) AS key_code, SUM({CENTS.format(row='')}), COUNT(*) "
+                              f"FROM {table} GROUP BY key_period, key_code")
+    return statements
+
+
+# Schema migrations - (version, description, statements); version is stored in database as PRAGMA user_version
+LEDGER_MIGRATIONS = [
+    (1, "Covering indexes on ledger date and code columns", [
+        "CREATE INDEX IF NOT EXISTS income_day ON income(day, amount)",
+        "CREATE INDEX IF NOT EXISTS income_code_day ON income(code, day, amount)",
+        "CREATE INDEX IF NOT EXISTS outcome_day ON outcome(day, amount)",
+        "CREATE INDEX IF NOT EXISTS outcome_code_day ON outcome(code, day, amount)",
+        "CREATE INDEX IF NOT EXISTS bills_date_type ON bills(date, type)",
+    ]),
+    (2, "ID as primary key on income and outcome",
+     _ledger_primary_key_statements("income") + _ledger_primary_key_statements("outcome")),
+    (3, "Trigger maintained daily, monthly and yearly totals", _totals_statements()),
+]
+
+SETTINGS_MIGRATIONS = [
+    (1, "Chart backend setting", [
+        "INSERT INTO settings(setting, value) SELECT 'chart_backend', 'matplotlib' "
+        "WHERE NOT EXISTS (SELECT 1 FROM settings WHERE setting = 'chart_backend')",
+    ]),
+    (2, "Internet access probe URL setting", [
+        "INSERT INTO settings(setting, value) SELECT 'network_probe_url', 'http://google.com' "
+        "WHERE NOT EXISTS (SELECT 1 FROM settings WHERE setting = 'network_probe_url')",
+    ]),
+]
+
+TASK_MIGRATIONS = [
+    (1, "Task date index", [
+        "CREATE INDEX IF NOT EXISTS tasks_date ON tasks(date)",
+    ]),
+    (2, "Task end date on every task and (start, end) index for tasks overlapping a date range", [
+        "UPDATE tasks SET date2 = date WHERE date2 IS NULL OR date2 = '' OR date2 < date",
+        "DROP INDEX IF EXISTS tasks_date",
+        "CREATE INDEX IF NOT EXISTS tasks_range ON tasks(date, date2)",
+    ]),
+]
+
+
+def schema_version(database_path):
+    """Returns schema version recorded in database"""
+    return get_connection(database_path).execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(database_path, migrations):
+    """
+    Apply migrations newer than database schema version - returns schema version after migration.
+
+    Every migration runs in its own transaction together with the version update. Query planner statistics
+    are rebuilt (ANALYZE) after migrations and refreshed with PRAGMA optimize on every run.
+    """
+
+    if not os.path.isfile(database_path):
+        logging.error(f"Migration skipped - database file does not exist: {database_path}")
+        return None
+
+    conn = get_connection(database_path)
+    version = schema_version(database_path)
+    pending = [migration for migration in migrations if migration[0] > version]
+
+    for migration_version, description, statements in pending:
+        try:
+            with transaction(database_path):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(migration_version)}")
+        except sqlite3.Error as err:
+            logging.error(f"Migration {migration_version} ({description}) failed on {database_path}: {err}")
+            break
+
+        version = migration_version
+        logging.info(f"Migration {version} applied to {database_path}: {description}")
+
+    if pending:
+        conn.execute("ANALYZE")
+    else:
+        conn.execute("PRAGMA optimize")
+    conn.commit()
+
+    return version
+
+
+def has_totals(database_path):
+    """Check if ledger database has summary (totals) tables"""
+    names = tuple(f"totals_{period}" for period in TOTALS_PERIODS)
+    query = f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(names))})"
+    return get_connection(database_path).execute(query, names).fetchone()[0] == len(names)
+
+
+def rebuild_totals(database_path):
+    """Recalculate summary tables of ledger database from income/outcome entries"""
+    with transaction(database_path) as conn:
+        for statement in _totals_rebuild_statements():
+            conn.execute(statement)
+    logging.info(f"Totals rebuilt for {database_path}")
+
+
+if __name__ == '__main__':
+    # Usage: python database.py migrate|rebuild-totals <ledger database>
+    import sys
+
+    command, path = sys.argv[1:3]
+    if command == "migrate":
+        print(f"Schema version: {migrate(path, LEDGER_MIGRATIONS)}")
+    elif command == "rebuild-totals":
+        rebuild_totals(path)
+        print("Totals rebuilt")
@@ -0,0 +1,92 @@
+"""
+Qt Designer forms for Finance Manager v3
+
+Forms (ui/*.ui) are compiled to Python modules once and kept in ui/compiled. Module name contains hash of .ui file,
+so a changed form is compiled again. All forms can be compiled at build time (before PyInstaller):
+
+    python forms.py
+
+If a form can not be compiled (e.g. read-only installation), it is loaded with uic.loadUi.
+"""
+import glob
+import hashlib
+import importlib.util
+import logging
+import os
+
+from PyQt6 import uic
+
+# Directory with compiled forms
+COMPILED_DIR = os.path.join("ui", "compiled")
+
+# Form classes already loaded - {ui file: (file modification time and size, form class)}
+_forms = {}
+
+
+def compiled_path(path):
+    """Path of compiled module for .ui file - name contains hash of file content"""
+    with open(path, "rb") as file:
+        digest = hashlib.sha1(file.read()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(COMPILED_DIR, f"{name}_{digest}.py")
+
+
+def compile_form(path):
+    """Compile .ui file to Python module if it is not compiled yet - returns module path"""
+    module_path = compiled_path(path)
+
+    if not os.path.isfile(module_path):
+        os.makedirs(COMPILED_DIR, exist_ok=True)
+
+        # Write to temporary file first - unfinished module is never loaded
+        temporary_path = f"{module_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            uic.compileUi(path, file)
+        os.replace(temporary_path, module_path)
+        logging.debug(f"Form {path} compiled to {module_path}")
+
+    return module_path
+
+
+def form_class(path):
+    """Returns form class (Ui_...) generated from .ui file"""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    if path in _forms and _forms[path][0] == key:
+        return _forms[path][1]
+
+    module_path = compile_form(path)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(module_path))[0], module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    form = next(value for name, value in vars(module).items() if name.startswith("Ui_"))
+    _forms[path] = (key, form)
+    return form
+
+
+def load_ui(path, widget):
+    """Set up widget from .ui file, like uic.loadUi(path, widget) - returns widget"""
+    try:
+        form = form_class(path)()
+    except Exception as err:
+        logging.warning(f"Form {path} loaded at runtime: {err}")
+        return uic.loadUi(path, widget)
+
+    form.setupUi(widget)
+
+    # Child widgets become attributes of widget (same as uic.loadUi)
+    for name, value in vars(form).items():
+        setattr(widget, name, value)
+
+    return widget
+
+
+if __name__ == '__main__':
+    # Compile all forms and remove modules compiled from older versions of forms
+    compiled = {compile_form(path) for path in glob.glob(os.path.join("ui", "*.ui"))}
+    for module_path in glob.glob(os.path.join(COMPILED_DIR, "*.py")):
+        if module_path not in compiled:
+            os.remove(module_path)
+    print(f"{len(compiled)} forms compiled to {COMPILED_DIR}")
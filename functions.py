@@ -12,13 +12,12 @@ import urllib.request
 # import requests
 # import base64
 
-import qtawesome as qta
+import database as db
 
 # from dropbox.files import WriteMode
 # from dropbox.exceptions import ApiError, AuthError
 from PyQt6.QtWidgets import QMessageBox
 from PyQt6.QtCore import QDate
-from openpyxl import Workbook, load_workbook
 from os.path import isfile
 
 
@@ -90,92 +89,70 @@ def load_logging_settings(path="settings.db"):
 
 
 # Database functions
-def get_data_from_database(database_path, query):
+def get_data_from_database(database_path, query, params=()):
     """
     Gets data from database.
 
     Keyword arguments:
     database_path: full or relative path to database
-    query: string used in sqlite execute
+    query: string used in sqlite execute - use ? placeholders for values
+    params: values bound to query placeholders
     """
 
     if not os.path.isfile(database_path):
         print("File does not exists!!")
         return
 
-    # Open database
-    conn = sqlite3.connect(database_path)
-
-    # Create cursor
-    cursor = conn.cursor()
+    # Reuse open cursor
+    cursor = db.get_cursor(database_path)
 
     # Execute query
-    cursor.execute(query)
-
-    # Save data
-    data = cursor.fetchall()
-
-    # Close database
-    conn.close()
+    cursor.execute(query, params)
 
     # Return data
-    return data
+    return cursor.fetchall()
 
 
-def update_database(database_path, query):
+def update_database(database_path, query, params=()):
     """
     Updates and saves changes to database.
 
     Keyword arguments:
     database_path: full or relative path to database
-    query: string used in sqlite execute
+    query: string used in sqlite execute - use ? placeholders for values
+    params: values bound to query placeholders
     """
-    # Open database
-    conn = sqlite3.connect(database_path)
+    # Reuse open connection
+    conn = db.get_connection(database_path)
 
-    # Create cursor
-    cursor = conn.cursor()
-
-    # Execute query
-    cursor.execute(query)
+    # Execute query - failed statement must not stay in open transaction
+    try:
+        db.get_cursor(database_path).execute(query, params)
+    except sqlite3.Error:
+        conn.rollback()
+        raise
 
     # Save changes
     conn.commit()
 
-    # Close database
-    conn.close()
-
 
-def save_data(database_path, query):
-    """Save data to database"""
+def save_data(database_path, query, params=()):
+    """Save data to database - query with ? placeholders, params bound to them"""
 
-    conn = sqlite3.connect(database_path)
-    c = conn.cursor()
-    c.execute(query)
+    conn = db.get_connection(database_path)
+    try:
+        db.get_cursor(database_path).execute(query, params)
+    except sqlite3.Error:
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
 
 
 def set_id(database_path, table):
     """Creates unique ID number for entry"""
 
-    query = f"SELECT id FROM {table}"
-    conn = sqlite3.connect(database_path)
-    c = conn.cursor()
-    # result = None
-    id_number = 1
     try:
-        c.execute(query)
-        result = c.fetchall()
-        n = len(result)
-        ids = []
-        for i in range(n):
-            ids.append(result[i][0])
-
-        while id_number in ids:
-            id_number = id_number + 1
-
-        return id_number
+        return db.reserve_ids(database_path, table)[0]
 
     except sqlite3.Error as e:
         print(f"The error '{e}' occurred")
@@ -185,15 +162,37 @@ def table_exists(database_path, table):
     """Check if table exists in given database - return TRUE or FALSE"""
     if os.path.isfile(database_path):
         # Create query
-        query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'"
+        query = "SELECT name FROM sqlite_master WHERE type='table' AND name = ?"
 
         # Check for table in database
-        if len(get_data_from_database(database_path, query)) == 1:
+        if len(get_data_from_database(database_path, query, (table,))) == 1:
             return True
         else:
             return False
 
 
+def totals_source(database, table, period="day"):
+    """
+    SQL source of income/outcome totals with columns period, code, cents (amount in cents)
+
+    :param database
+    :param table: income OR outcome
+    :param period: day (YYYY-MM-DD), month (YYYY-MM) OR year (YYYY)
+    :return: subquery on trigger maintained summary table if database has it, otherwise on ledger entries
+    """
+    if db.has_totals(database):
+        return f"(SELECT period, code, cents FROM main.totals_{period} WHERE ledger = '{table}')"
+
+    return f"(SELECT substr(day, 1, {db.TOTALS_PERIODS[period]}) AS period, code, " \
+           f"{db.CENTS.format(row='')} AS cents FROM main.{table})"
+
+
+def calculate_period_total(database, table, period, key):
+    """Calculate income/outcome total for one day (YYYY-MM-DD), month (YYYY-MM) or year (YYYY)"""
+    query = f"SELECT SUM(cents) FROM {totals_source(database, table, period)} WHERE period = ?"
+    return (get_data_from_database(database, query, (key,))[0][0] or 0) / 100
+
+
 def calculate_year_totals(year, database):
     """
     Calculate income/outcome yearly total
@@ -201,76 +200,41 @@ def calculate_year_totals(year, database):
     :param database: string income/outcome
     :return: float total - sum of all income/outcome in database
     """
-    income = get_data_from_database(database,
-                                    f"SELECT amount FROM income WHERE day > '{year}-01-01' AND day < '{year}-12-31'")
-    outcome = get_data_from_database(database,
-                                     f"SELECT amount FROM outcome WHERE day > '{year}-01-01' AND day < '{year}-12-31'")
-
-    return sum([i[0] for i in income]), sum([i[0] for i in outcome])
+    return calculate_period_total(database, "income", "year", str(year)), \
+        calculate_period_total(database, "outcome", "year", str(year))
 
 
 def calculate_daily_totals(database):
     """Calculate daily money traffic"""
-    income = get_data_from_database(database,
-                                    f"SELECT amount FROM income WHERE day = '{QDate.currentDate().toPyDate()}'")
-
-    outcome = get_data_from_database(database,
-                                     f"SELECT amount FROM outcome WHERE day = '{QDate.currentDate().toPyDate()}'")
-
-    return sum(i[0] for i in income), sum([i[0] for i in outcome])
-
-
-# Load data from bank report
-def decode_input_file(path):
-    """Decodes data from bank report"""
-    # Učitava podatke iz izvoda i vraca listu s podacima
-    data = []
-    nlines = sum(1 for _ in open(path))
-    with open(path, 'r') as file:
-        for line in range(2, nlines):
-            data.append(file.readlines(line))
-
-    br_izvoda = data[1][0][166:169]
-    yy_izvoda = data[0][0][72:76]
-
-    data = data[2:(nlines - 3)]
-
-    result = []
-    for i in data:
-        text = i[0]
-        text = text.replace("Æ", "Ć")
-        text = text.replace("È", "Č")
-        text = text.replace("æ", "ć")
-        text = text.replace("è", "č")
-        text.upper()
-
-        income_outcome_id = (text[0:2])
-        # iban = text[2:36].strip()
-        uplatitelj = text[36:106].strip()
-        # adresa = text[106:141].strip()
-        # mjesto = text[141:176].strip()
-        datum = text[176:184].strip()
-        iznos = float(text[228:242].strip()) / 100
-        poziv_na_broj = text[268:294].strip()
-        opis = text[298:480].strip()
-
-        # PRIHOD/RASHOD
-        if income_outcome_id == "10":
-            i_o_value = "Rashod"
-        elif income_outcome_id == "20":
-            i_o_value = "Prihod"
-        else:
-            i_o_value = "Nepoznato"
+    today = str(QDate.currentDate().toPyDate())
+
+    return calculate_period_total(database, "income", "day", today), \
+        calculate_period_total(database, "outcome", "day", today)
+
+
+def calculate_code_totals(database, settings_file, table, date_from, date_to, excluded=()):
+    """
+    Calculate income/outcome totals per code for period with one grouped query
 
-        # DATUM
-        yy = datum[0:4]
-        mm = datum[4:6]
-        dd = datum[6:8]
-        date_value = "{}.{}.{}.".format(dd, mm, yy)
+    :param database: ledger database path
+    :param settings_file: settings database path - source of code descriptions
+    :param table: income OR outcome
+    :param date_from: start date (inclusive)
+    :param date_to: end date (inclusive)
+    :param excluded: codes left out of result (transfers)
+    :return: list of [code, description, total] for every code in settings, ordered by code
+    """
+    conn = db.attach(database, settings_file, "settings")
 
-        result.append([i_o_value, opis, iznos, date_value, br_izvoda, uplatitelj, poziv_na_broj])
+    query = f"SELECT codes.code, codes.description, IFNULL(totals.cents, 0) / 100.0 " \
+            f"FROM settings.{table} AS codes " \
+            f"LEFT JOIN (SELECT code, SUM(cents) AS cents FROM {totals_source(database, table)} " \
+            f"WHERE period >= ? AND period <= ? GROUP BY code) AS totals ON totals.code = codes.code " \
+            f"WHERE codes.code NOT IN ({', '.join('?' * len(excluded))}) " \
+            f"ORDER BY codes.code"
+    params = (str(date_from)[:10], str(date_to)[:10]) + tuple(int(code) for code in excluded)
 
-    return result, yy_izvoda
+    return [[str(code), desc, total] for code, desc, total in conn.execute(query, params)]
 
 
 def write_to_excel(data, filename, sheet=None, header=None):
@@ -282,6 +246,8 @@ def write_to_excel(data, filename, sheet=None, header=None):
     :param header: column names
     :return: Nothing
     """
+    # openpyxl is loaded only for export
+    from openpyxl import Workbook, load_workbook
 
     # Create workbook
     if isfile(filename):
@@ -310,30 +276,104 @@ def write_to_excel(data, filename, sheet=None, header=None):
     wb.save(filename=filename)
 
 
-def calculate_totals(start, stop, table, database):
+# Time buckets for totals - SQL expression mapping day (YYYY-MM-DD) to first day of its bucket
+TOTALS_BUCKETS = {
+    "day": "period",
+    "week": "date(period, 'weekday 0', '-6 days')",
+    "month": "substr(period, 1, 7) || '-01'",
+    "year": "substr(period, 1, 4) || '-01-01'",
+}
+
+
+def calculate_totals(start, stop, table, database, bucket="day", fill=False):
     """
-    Calculates income/outcome totals
+    Calculates income/outcome totals per time bucket with one grouped query
 
-    :param start: QDate, start date
-    :param stop: QDate, end date
+    :param start: date, start date (inclusive)
+    :param stop: date, end date (inclusive)
     :param table: income OR outcome
     :param database
-    :return: dates, total
+    :param bucket: day, week (starting Monday), month OR year
+    :param fill: add buckets without entries with total 0
+    :return: dates (first day of bucket, YYYY-MM-DD), total
     """
 
-    # Get dates
-    query = f"SELECT day FROM {table} WHERE day > '{start}' AND day < '{stop}'"
-    dates = get_data_from_database(database, query)
-    dates = list(set([i[0] for i in dates]))
-    dates.sort()
+    start = datetime.date.fromisoformat(str(start)[:10])
+    stop = datetime.date.fromisoformat(str(stop)[:10])
 
-    # Calculate daily sums
-    total = []
-    for idate, date in enumerate(dates):
-        data = get_data_from_database(database, f"SELECT amount FROM {table} WHERE day = '{date}'")
-        total.append(sum([i[0] for i in data]))
+    query = f"SELECT {TOTALS_BUCKETS[bucket]} AS bucket, SUM(cents) / 100.0 FROM {totals_source(database, table)} " \
+            f"WHERE period >= ? AND period <= ? GROUP BY bucket ORDER BY bucket"
+    data = get_data_from_database(database, query, (str(start), str(stop)))
+
+    if not fill:
+        return [i[0] for i in data], [i[1] for i in data]
+
+    totals = dict(data)
+    dates = list(bucket_dates(start, stop, bucket))
+    return dates, [totals.get(date, 0.0) for date in dates]
 
-    return dates, total
+
+def bucket_dates(start, stop, bucket="day"):
+    """Generates first days (YYYY-MM-DD) of all buckets between start and stop dates"""
+
+    if bucket == "day":
+        date = start
+    elif bucket == "week":
+        date = start - datetime.timedelta(days=start.weekday())
+    elif bucket == "month":
+        date = start.replace(day=1)
+    else:
+        date = start.replace(month=1, day=1)
+
+    while date <= stop:
+        yield str(date)
+
+        if bucket == "day":
+            date += datetime.timedelta(days=1)
+        elif bucket == "week":
+            date += datetime.timedelta(days=7)
+        elif bucket == "month":
+            date = date.replace(year=date.year + date.month // 12, month=date.month % 12 + 1)
+        else:
+            date = date.replace(year=date.year + 1)
+
+
+def get_years(database, table):
+    """Get available years from database - sorted list of int"""
+    query = f"SELECT DISTINCT period FROM {totals_source(database, table, 'year')} ORDER BY 1"
+    return [int(year[0]) for year in get_data_from_database(database, query)]
+
+
+def calculate_totals_per_year(database, table):
+    """Calculate income/outcome totals per year - returns dict year: total"""
+    query = f"SELECT period, SUM(cents) / 100.0 FROM {totals_source(database, table, 'year')} GROUP BY period"
+    return {int(year): total for year, total in get_data_from_database(database, query)}
+
+
+def calculate_year_code_pivot(database, table, codes):
+    """
+    Calculates income/outcome totals per code per year with one grouped query
+
+    :param database
+    :param table: income OR outcome
+    :param codes: list of codes - matrix rows
+    :return: matrix (rows codes, columns years), codes, years
+    """
+    years = get_years(database, table)
+
+    # Row and column positions
+    code_index = {int(code): icode for icode, code in enumerate(codes)}
+    year_index = {year: iyear for iyear, year in enumerate(years)}
+
+    matrix = [[0.0] * len(years) for _ in codes]
+
+    query = f"SELECT period, code, SUM(cents) / 100.0 FROM {totals_source(database, table, 'year')} " \
+            f"GROUP BY period, code"
+    for year, code, total in get_data_from_database(database, query):
+        if code in code_index:
+            matrix[code_index[code]][year_index[int(year)]] = total
+
+    return matrix, list(codes), years
 
 
 def handle_dates(dates):
@@ -348,224 +388,49 @@ def handle_dates(dates):
     return dates
 
 
+# Style colors - (background, text, widget background, button hover, disabled tab text); Default uses system colors
+STYLE_COLORS = {
+    "BlueGreyDark": ("#102A43", "#F0F4F8", "#243B53", "#334E68", "#778899"),
+    "BlueGreyLight": ("#BCCCDC", "#102A43", "#9FB3C8", "#B3C5D7", "#778899"),
+    "CoolGrey": ("#1F2933", "#F5F7FA", "#323F4B", "#3E4C59", "#778899"),
+    "DarkRed": ("#1A0000", "#FF9999", "#660000", "#990000", "#778899"),
+    "WarmGrey": ("#27241D", "#FAF9F7", "#423D33", "#504A40", "#778899"),
+    "Green": ("#004A40", "#FAF9F7", "#005146", "#007666", "#778899"),
+}
+
+# Styles can also be given by number
+STYLE_NUMBERS = {1: "BlueGreyDark", 2: "BlueGreyLight", 3: "CoolGrey", 4: "DarkRed", 5: "WarmGrey", 6: "Green"}
+
+
+def style_colors(style="Default"):
+    """
+    Colors of style
+    :param style: style name or number
+    :return: dict with background, text, widget_background, button_hover and disabled_tab_text_color;
+             None for Default style
+    """
+    colors = STYLE_COLORS.get(STYLE_NUMBERS.get(style, style))
+    if colors is None:
+        return None
+    return dict(zip(["background", "text", "widget_background", "button_hover", "disabled_tab_text_color"], colors))
+
+
 def create_stylesheet(style: str = "Default") -> str:
     """
-    Creates stylesheet text
+    Returns stylesheet text of theme (themes are loaded from styles directory once)
     :param style: Stylesheet
     :return: Stylesheet text
     """
+    import themes
 
-    background = None
-    text = None
-    widget_background = None
-    button_hover = None
-    disabled_tab_text_color = None
-
-    if style == 1 or style == "BlueGreyDark":
-        background = "#102A43"
-        text = "#F0F4F8"
-        widget_background = "#243B53"
-        button_hover = "#334E68"
-        disabled_tab_text_color = "#778899"
-    elif style == 2 or style == "BlueGreyLight":
-        background = "#BCCCDC"
-        text = "#102A43"
-        widget_background = "#9FB3C8"
-        button_hover = "#B3C5D7"
-        disabled_tab_text_color = "#778899"
-    elif style == 3 or style == "CoolGrey":
-        background = "#1F2933"
-        text = "#F5F7FA"
-        widget_background = "#323F4B"
-        button_hover = "#3E4C59"
-        disabled_tab_text_color = "#778899"
-    elif style == 4 or style == "DarkRed":
-        background = "#1A0000"
-        text = "#FF9999"
-        widget_background = "#660000"
-        button_hover = "#990000"
-        disabled_tab_text_color = "#778899"
-    elif style == 5 or style == "WarmGrey":
-        background = "#27241D"
-        text = "#FAF9F7"
-        widget_background = "#423D33"
-        button_hover = "#504A40"
-        disabled_tab_text_color = "#778899"
-    elif style == 6 or style == "Green":
-        background = "#004A40"
-        text = "#FAF9F7"
-        widget_background = "#005146"
-        button_hover = "#007666"
-        disabled_tab_text_color = "#778899"
-    else:
-        style = "Default"
-
-    # Create stylesheet
-    if style not in ["Default", 0]:
-        stylesheet_text = \
-            f"""
-                QWidget{{
-                    background-color: {background};
-                    color: {text};
-                    font: 12pt "Calibri";
-                }}
-                
-                .FinanceManager {{
-                    width: 100%;
-                }}
-                
-                #club {{
-                    font: 16pt "Calibri";
-                }}
-                
-                QPushButton, QComboBox, QDateEdit, QSpinBox, QLineEdit, QTabBar:tab, QHeaderView::section,
-                QTreeWidget, QTableCornerButton::section {{
-                    background-color: {widget_background};
-                }}
-                
-                QCalendarWidget QWidget {{
-                    alternate-background-color: {widget_background};
-                }}
-                
-                QLabel {{
-                    width: 100px;
-                    height: 25px;
-                }}
-                
-                QPushButton {{
-                    width: 125px;
-                    height: 30px;
-                    max-width: 125px;
-                    max-height:30px;
-                    margin: 0px 5px;
-                    border-radius: 10px;
-                    color: {text};
-                }}
-                
-                #add_row, #remove_row, #btn_hide, #btn_network, #btn_exit, #btn_backup {{
-                    width: 40px;
-                    height: 30px;
-                }}
-                
-                QPushButton:hover {{
-                    background-color: {button_hover};
-                    border: 2px solid {widget_background};
-                }}
-                
-                QTabBar:tab:selected {{
-                    background-color: {button_hover};
-                    border: 2px solid {widget_background};
-                }}
-                
-                QDateEdit, QHeaderView::section, QComboBox {{
-                    border: 1px solid {button_hover};
-                }}
-                
-                QTabBar:tab {{
-                    margin-right: 5px;
-                    width: 30px;
-                    height: 71px;
-                    font: 10pt "Calibri";
-                    font-weight: bold;
-                }}
-                
-                QTabBar:tab:disabled {{
-                    color: {disabled_tab_text_color}
-                }}
-                
-                QTabWidget::pane {{
-                    border: none;
-                }}
-                
-                QHeaderView::section {{
-                    font-size: 14px;
-                }}
-                
-                QTreeWidget {{
-                    alternate-background-color: {button_hover};
-                }}
-                
-                QTableWidget {{
-                    color: white;
-                    gridline-color: {text};
-                }}
-                
-                Line {{
-                    background-color: {text};
-                }}
-            """
-
-        # Set Icons defaults
-        qta.set_defaults(color=text, scale_factor=0.70)
-
-        return stylesheet_text
-
-    else:
-        stylesheet_text = """
-        QWidget{
-            font: 12pt "Calibri";
-        }
-        .FinanceManager {
-            width: 100%;
-        }
-        #club {
-            font: 16pt "Calibri";
-        }
-        QLabel {
-            width: 100px;
-            height: 25px;
-        }
-        QPushButton {
-            width: 125px;
-            height: 30px;
-            max-width: 125px;
-            max-height:30px;
-            margin: 0px 5px;
-        }
-        #add_row, #remove_row, #btn_hide, #btn_network {
-            width: 40px;
-            height: 30px;
-        }
-        QTabBar:tab {
-            margin-right: 5px;
-            width: 30px;
-            height: 71px;
-            font: 10pt "Calibri";
-            font-weight: bold;
-        }
-        
-        QTabBar:tab:selected {
-            border: 1px solid grey;
-            border-right: 2px solid red;
-            background-color: rgb(200, 200, 200)
-        }
-        
-        QTabWidget::pane {
-            border: none;
-        }
-        """
-
-        return stylesheet_text
+    return themes.registry.theme(style).stylesheet
 
 
 def create_link_style(style="Default"):
     """Returns CSS for link format"""
-    if style == 1 or style == "BlueGreyDark":
-        text = "#F0F4F8"
-    elif style == 2 or style == "BlueGreyLight":
-        text = "#102A43"
-    elif style == 3 or style == "CoolGrey":
-        text = "#F5F7FA"
-    elif style == 4 or style == "DarkRed":
-        text = "#FF9999"
-    elif style == 5 or style == "WarmGrey":
-        text = "#FAF9F7"
-    elif style == 6 or style == "Green":
-        text = "#FAF9F7"
-    else:
-        text = "black"
+    import themes
 
-    return f'style="color: {text}; text-decoration: none;"'
+    return themes.registry.theme(style).link_style()
 
 
 def backup_file(localfile, dest, token):
@@ -628,10 +493,10 @@ def download_database(dropbox_file_path, local_file_path, token):
     pass
 
 
-def check_internet_connection():
-    """Check for internet connection"""
+def check_internet_connection(url="http://google.com", timeout=5):
+    """Check for internet connection - request to url must be answered within timeout (seconds)"""
     try:
-        urllib.request.urlopen(url="http://google.com")
+        urllib.request.urlopen(url=url, timeout=timeout).close()
         logging.info("Internet connected")
         return True
     except Exception as error:
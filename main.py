@@ -7,13 +7,17 @@ and easy one click reports creating.
 # pylint: disable=fixme
 # pylint: disable=line-too-long
 
+import startup
 import sys
 import logging
 from traceback import format_exception
 from PyQt6.QtWidgets import QApplication
 from functions import load_logging_settings
+from database import close_all
 from UserInterface import UI
 
+startup.timer.phase("imports")
+
 
 def excepthook(etype, value, traceback) -> None:
     """
@@ -32,11 +36,18 @@ if __name__ == '__main__':
     # Logging unhandled errors to file not console - commented for debugging
     # sys.excepthook = excepthook
 
+    # Log startup phase timings (python main.py --startup-timings)
+    startup.timer.enabled = "--startup-timings" in sys.argv
+
     # Run app
     logging.info("Application started!")
     app = QApplication(sys.argv)
     window = UI()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+
+    # Close database connections - background queries are finished on aboutToQuit
+    close_all()
+    sys.exit(exit_code)
 
 
 # Bugs
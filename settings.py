@@ -3,6 +3,45 @@ import logging
 import functions as fn
 
 
+class CodeCatalog:
+    """
+    Income and outcome codes with descriptions - loaded once from settings file.
+
+    Code tables are not edited by the application, changes made to them in settings file while application is
+    running are used after restart (or reboot when settings are saved).
+    """
+
+    def __init__(self, file):
+        """Load code tables from settings file (db, sqlite)"""
+        self.file = file
+        self.descriptions = {}
+        self.items = {}
+        self.load()
+
+    def load(self):
+        """Load code tables from settings file"""
+        for table in ["income", "outcome"]:
+            rows = fn.get_data_from_database(self.file, f"SELECT code, description FROM {table} ORDER BY code")
+            self.descriptions[table] = {code: desc for code, desc in rows}
+
+            # Combo box items
+            self.items[table] = [str(code) for code, _ in rows]
+
+        logging.debug("Code catalog loaded from settings file")
+
+    def rows(self, table):
+        """Returns list of (code, description) for table"""
+        return list(self.descriptions[table].items())
+
+    def has_code(self, table, code):
+        """Check if code exists in table"""
+        return str(code).isdigit() and int(code) in self.descriptions[table]
+
+    def description(self, table, code):
+        """Returns description of code"""
+        return self.descriptions[table][int(code)]
+
+
 class Settings:
     """Setting class contains information for GUI of Finance Manager v3.0"""
 
@@ -16,8 +55,8 @@ class Settings:
             self.__setattr__(setting[0], setting[1])
             logging.debug(f"Setting {setting[0]} to {setting[1]}")
 
+        self.catalog = CodeCatalog(self.file)
         self.codes = self.get_codes()
-        logging.debug("Code loaded from settings file")
 
     def get_setting(self, setting):
         """Get setting value"""
@@ -31,28 +70,28 @@ class Settings:
         """Save settings to database"""
 
         for setting in self.__dict__:
-            query = f"UPDATE settings SET value='{self.get_setting(setting)}' WHERE setting='{setting}'"
-            fn.update_database(self.file, query)
+            fn.update_database(self.file, "UPDATE settings SET value = ? WHERE setting = ?",
+                               (str(self.get_setting(setting)), setting))
 
     def get_codes(self):
         """Load income and outcome codes from settings file; returns dict"""
 
         return {
-            "income": fn.get_data_from_database(self.file, "SELECT * FROM income"),
-            "outcome": fn.get_data_from_database(self.file, "SELECT * FROM outcome")
+            "income": self.catalog.rows("income"),
+            "outcome": self.catalog.rows("outcome")
         }
 
     def get_income_codes(self):
         """Returns income codes only (no description)"""
-        return [str(i[0]) for i in self.codes["income"]]
+        return self.catalog.items["income"]
 
     def get_outcome_codes(self):
         """Returns outcome codes only (no description)"""
-        return [str(i[0]) for i in self.codes["outcome"]]
+        return self.catalog.items["outcome"]
 
     def get_code_desc(self, table, code):
         """Return description of code for given code and table"""
-        return fn.get_data_from_database(self.file, f"SELECT * FROM {table} WHERE code = {code}")[0][1]
+        return self.catalog.description(table, code)
 
     def __str__(self):
         string = ""
@@ -0,0 +1,48 @@
+"""
+Startup timings for Finance Manager 3.0
+
+Imported first by main.py, so the time of every startup phase is measured from process start.
+Timings are written to log when application is started with --startup-timings argument.
+"""
+import logging
+import time
+
+
+class StartupTimer:
+    """Records startup phases - every phase lasts from the end of previous one"""
+
+    # Phases after which startup is finished - data loaded and window painted
+    LAST_PHASES = {"first query", "first paint"}
+
+    def __init__(self):
+        """Constructor"""
+        self.enabled = False
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+        self.reported = False
+
+    def phase(self, name):
+        """Mark end of startup phase"""
+        if self.reported:
+            return
+
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last, now - self.start))
+        self.last = now
+
+        if self.LAST_PHASES <= {phase[0] for phase in self.phases}:
+            self.report()
+
+    def report(self):
+        """Write recorded phases to log (once)"""
+        self.reported = True
+        if not self.enabled:
+            return
+
+        for name, duration, elapsed in self.phases:
+            logging.info(f"Startup phase {name}: {duration:.3f} s (at {elapsed:.3f} s)")
+        logging.info(f"Startup finished in {self.last - self.start:.3f} s")
+
+
+# Application startup timer
+timer = StartupTimer()
@@ -0,0 +1,110 @@
+"""
+Bank statement (izvod) reader for Finance Manager 3.0
+
+Statement is fixed-width text file in bank code page (Windows-1250): file header line, statement header line,
+one line per transaction and three trailer lines. File is read once, line by line, and every line is returned as
+typed record, with fields sliced by column layouts below.
+"""
+import datetime
+from collections import deque, namedtuple
+from decimal import Decimal, InvalidOperation
+
+# Code page of statement files
+ENCODING = "cp1250"
+
+# Number of trailer lines after transactions
+TRAILER_LINES = 3
+
+# Transaction direction by record type
+DIRECTIONS = {"10": "Rashod", "20": "Prihod"}
+UNKNOWN_DIRECTION = "Nepoznato"
+
+
+class StatementError(ValueError):
+    """Line of statement can not be decoded"""
+
+
+def _text(value):
+    """Text field"""
+    return value.strip()
+
+
+def _date(value):
+    """Date field - yyyymmdd"""
+    return datetime.datetime.strptime(value.strip(), "%Y%m%d").date()
+
+
+def _amount(value):
+    """Amount field - in cents"""
+    try:
+        return Decimal(value.strip()).scaleb(-2)
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}")
+
+
+def _direction(value):
+    """Record type - income or outcome"""
+    return DIRECTIONS.get(value, UNKNOWN_DIRECTION)
+
+
+# Column layouts - {field: (start, stop, converter)}
+FILE_HEADER_LAYOUT = {
+    "year": (72, 76, int),
+}
+
+STATEMENT_HEADER_LAYOUT = {
+    "number": (166, 169, _text),
+}
+
+TRANSACTION_LAYOUT = {
+    "direction": (0, 2, _direction),
+    # IBAN [2:36], address [106:141] and place [141:176] are not used
+    "payer": (36, 106, _text),
+    "date": (176, 184, _date),
+    "amount": (228, 242, _amount),
+    "reference": (268, 294, _text),
+    "description": (298, 480, _text),
+}
+
+# Records
+FileHeader = namedtuple("FileHeader", FILE_HEADER_LAYOUT)
+StatementHeader = namedtuple("StatementHeader", STATEMENT_HEADER_LAYOUT)
+Transaction = namedtuple("Transaction", TRANSACTION_LAYOUT)
+Trailer = namedtuple("Trailer", ["text"])
+
+
+def parse_line(line, record, layout, line_number=None):
+    """Returns record with fields of line sliced and converted by layout"""
+    try:
+        return record(*(convert(line[start:stop]) for start, stop, convert in layout.values()))
+    except ValueError as err:
+        raise StatementError(f"Line {line_number}: {err}") from err
+
+
+def read_statement(path):
+    """
+    Yields records of statement file - FileHeader, StatementHeader, Transaction for every transaction and Trailer
+    for every trailer line. Transactions are yielded while file is read; last lines are kept back until it is known
+    they are not trailer.
+    """
+    pending = deque()
+
+    with open(path, "rb") as file:
+        for line_number, raw_line in enumerate(file, start=1):
+            try:
+                line = raw_line.decode(ENCODING).rstrip("\r\n")
+            except UnicodeDecodeError as err:
+                raise StatementError(f"Line {line_number}: {err}") from err
+
+            if line_number == 1:
+                yield parse_line(line, FileHeader, FILE_HEADER_LAYOUT, line_number)
+            elif line_number == 2:
+                yield parse_line(line, StatementHeader, STATEMENT_HEADER_LAYOUT, line_number)
+            else:
+                pending.append((line_number, line))
+                if len(pending) > TRAILER_LINES:
+                    transaction_number, transaction_line = pending.popleft()
+                    yield parse_line(transaction_line, Transaction, TRANSACTION_LAYOUT, transaction_number)
+
+    for _, line in pending:
+        yield Trailer(line)
@@ -0,0 +1,104 @@
+"""
+Themes for Finance Manager 3.0
+
+Every theme is prepared once - Default stylesheet is read from styles/Default.stylesheet, other themes fill
+styles/theme.template with their colors (functions.STYLE_COLORS). Stylesheet text and icons tinted with theme text
+color are kept, so switching back to a theme already used does not build anything again.
+"""
+import logging
+import os
+from string import Template
+
+import qtawesome as qta
+
+from functions import STYLE_COLORS, STYLE_NUMBERS, style_colors
+
+# Directory with stylesheets
+STYLES_DIR = "styles"
+
+# Theme with system colors
+DEFAULT_THEME = "Default"
+
+# Icon options of colored themes
+ICON_SCALE_FACTOR = 0.70
+
+
+class Theme:
+    """Theme palette with its stylesheet and tinted icons"""
+
+    def __init__(self, name, colors, stylesheet):
+        """Constructor"""
+        self.name = name
+        self.colors = colors
+        self.stylesheet = stylesheet
+
+        # Icons - {(icon name, color): QIcon}
+        self._icons = {}
+
+    def color(self, key, default=None):
+        """Returns palette color or default for Default theme"""
+        return self.colors[key] if self.colors else default
+
+    def icon(self, name, color=None):
+        """Returns qtawesome icon tinted with theme text color (or given color)"""
+        key = (name, color)
+        if key not in self._icons:
+            options = {}
+            if self.colors:
+                options = {"color": self.colors["text"], "scale_factor": ICON_SCALE_FACTOR}
+            if color is not None:
+                options["color"] = color
+            self._icons[key] = qta.icon(name, **options)
+
+        return self._icons[key]
+
+    def link_style(self):
+        """Returns CSS for link format"""
+        return f'style="color: {self.color("text", "black")}; text-decoration: none;"'
+
+
+class ThemeRegistry:
+    """Themes loaded from styles directory - every theme is loaded once"""
+
+    def __init__(self, directory=STYLES_DIR):
+        """Constructor"""
+        self.directory = directory
+        self._themes = {}
+        self._template = None
+
+    def names(self):
+        """Names of all themes"""
+        return [DEFAULT_THEME] + list(STYLE_COLORS)
+
+    def theme(self, style=DEFAULT_THEME):
+        """Returns theme by name or number - unknown style returns Default theme"""
+        name = STYLE_NUMBERS.get(style, style)
+        if name not in STYLE_COLORS:
+            name = DEFAULT_THEME
+
+        if name not in self._themes:
+            self._themes[name] = self.load(name)
+
+        return self._themes[name]
+
+    def load(self, name):
+        """Create theme from styles directory"""
+        if name == DEFAULT_THEME:
+            theme = Theme(name, None, self.read(f"{DEFAULT_THEME}.stylesheet"))
+        else:
+            if self._template is None:
+                self._template = Template(self.read("theme.template"))
+            colors = style_colors(name)
+            theme = Theme(name, colors, self._template.substitute(colors))
+
+        logging.debug(f"Theme {name} loaded")
+        return theme
+
+    def read(self, file_name):
+        """Returns text of file in styles directory"""
+        with open(os.path.join(self.directory, file_name), encoding="utf-8") as file:
+            return file.read()
+
+
+# Application themes
+registry = ThemeRegistry()